@@ -1,3 +1,7 @@
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
 import sys
 import subprocess
 import threading
@@ -5,218 +9,3091 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
 import json
-import base64
 import tempfile
+import shutil
+import keyword
+import importlib
+import importlib.util
+import hashlib
+import re
+
+# PyInstaller hack: скрыть консольное окно в exe
+if hasattr(sys, 'frozen'):
+    try:
+        import ctypes
+        ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
+    except Exception:
+        pass
+
+# ==== Опциональные зависимости: только проверка наличия, без загрузки ====
+# Сами модули импортируются при первом обращении (get_requests/get_jedi),
+# чтобы не платить за них до отрисовки первого окна.
+# PYTHONTOOLPACK_DISABLE=requests,jedi — притвориться, что модулей нет (для замеров).
+# Модули стандартной библиотеки, нужные лишь отдельным функциям (concurrent.futures,
+# zipfile, csv, difflib, email.parser, ast, random), импортируются внутри этих функций.
+
+_DISABLED_DEPS = {n.strip() for n in os.environ.get("PYTHONTOOLPACK_DISABLE", "").split(",") if n.strip()}
+
+def probe_module(name):
+    if name in _DISABLED_DEPS:
+        return False
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+HAS_REQUESTS = probe_module("requests")
+HAS_JEDI = probe_module("jedi")
+HAS_PACKAGING = probe_module("packaging")
+
+_lazy_modules = {}
+_lazy_lock = threading.Lock()
+
+def lazy_import(name):
+    mod = _lazy_modules.get(name)
+    if mod is None:
+        with _lazy_lock:
+            mod = _lazy_modules.get(name)
+            if mod is None:
+                mod = importlib.import_module(name)
+                _lazy_modules[name] = mod
+    return mod
+
+def get_requests():
+    return lazy_import("requests")
+
+def get_jedi():
+    return lazy_import("jedi")
+
+CONFIG_FILE = "config.json"
+CACHE_DIR = "pythontoolpack_cache"
+
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_config(cfg):
+    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cfg, f)
+
+def write_file_atomic(path, data):
+    # Пишем во временный файл рядом и подменяем одним os.replace
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)  # mkstemp создаёт файл с правами 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+config = load_config()
+
+def get_default_python():
+    return config.get("python_path") or sys.executable
+
+# ===== GitHub API AUTH =====
+
+GITHUB_TOKEN_KEY = "github_token"
+GITHUB_USER_KEY = "github_user"
+
+def ask_install_requests():
+    messagebox.showinfo(
+        "Нужна библиотека requests",
+        "Для работы с GitHub и онлайн-операциями установите библиотеку requests"
+    )
+
+def ask_install_jedi():
+    messagebox.showinfo(
+        "Нужна библиотека jedi",
+        "Для автодополнения и интеллектуальных подсказок установите библиотеку jedi"
+    )
+
+def save_github_token(token, user):
+    config[GITHUB_TOKEN_KEY] = token
+    config[GITHUB_USER_KEY] = user
+    save_config(config)
+
+def remove_github_token():
+    config.pop(GITHUB_TOKEN_KEY, None)
+    config.pop(GITHUB_USER_KEY, None)
+    save_config(config)
+
+def is_github_authenticated():
+    return GITHUB_TOKEN_KEY in config and GITHUB_USER_KEY in config
+
+def get_github_token():
+    return config.get(GITHUB_TOKEN_KEY) or ""
+
+def get_github_user():
+    return config.get(GITHUB_USER_KEY) or ""
+
+def github_auth_window():
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return
+    win = tk.Toplevel(root)
+    win.title("Авторизация через GitHub")
+    win.geometry("400x170")
+    win.grab_set()
+    tk.Label(win, text="Введите Personal Access Token (PAT):").pack(pady=10)
+    entry = tk.Entry(win, show="*", width=40)
+    entry.pack()
+    status = tk.Label(win, text="", fg="red")
+    status.pack(pady=5)
+    def do_auth():
+        token = entry.get().strip()
+        if not token:
+            status.config(text="Введите токен!")
+            return
+        status.config(text="Проверка токена...", fg="black")
+        btn_login.config(state="disabled")
+        def worker():
+            # Запрос идёт через общий планировщик и может ждать паузы лимита — не в потоке Tk
+            try:
+                resp = github_request("GET", f"{GITHUB_API}/user", headers=github_auth_headers(token), timeout=5)
+                login = resp.json().get("login", "unknown") if resp.status_code == 200 else None
+                error = None if login else "Ошибка авторизации!"
+            except Exception as e:
+                login, error = None, f"Ошибка: {e}"
+            root.after(0, lambda: finish(login, error))
+        def finish(login, error):
+            if login:
+                save_github_token(token, login)
+                update_github_auth_button()
+            if not win.winfo_exists():
+                return
+            btn_login.config(state="normal")
+            if error:
+                status.config(text=error, fg="red")
+                return
+            status.config(text=f"Успешно! Зашли как {login}", fg="green")
+            win.after(800, win.destroy)
+        threading.Thread(target=worker, daemon=True).start()
+    btn_login = tk.Button(win, text="Войти", command=do_auth)
+    btn_login.pack(pady=10)
+    entry.bind('<Return>', lambda e: do_auth())
+
+def logout_github():
+    remove_github_token()
+    update_github_auth_button()
+
+def update_github_auth_button():
+    if is_github_authenticated():
+        btn_github_auth.config(text=f"Выйти ({get_github_user()})", command=logout_github)
+    else:
+        btn_github_auth.config(text="Авторизоваться", command=github_auth_window)
+
+# ===== GitHub HTTP: общий клиент и дисковый кэш =====
+# Одна сессия requests на всё приложение (keep-alive, пул соединений) и кэш ответов
+# на диске с ключом по URL. Повторные запросы уходят с If-None-Match/If-Modified-Since,
+# ответ 304 отдаётся из кэша и не расходует лимит запросов GitHub.
+
+GITHUB_API = "https://api.github.com"
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+
+_github_session = [None]
+_github_session_lock = threading.Lock()
+
+def get_github_session():
+    with _github_session_lock:
+        if _github_session[0] is None:
+            requests = get_requests()
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "PythonToolPack",
+            })
+            _github_session[0] = session
+        return _github_session[0]
+
+def github_auth_headers(token=None):
+    token = get_github_token() if token is None else token
+    return {"Authorization": f"token {token}"} if token else {}
+
+def _http_cache_path(url):
+    # Пользователь входит в ключ, чтобы кэш разных аккаунтов не смешивался
+    key = hashlib.sha256(f"{get_github_user()}\n{url}".encode("utf-8")).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, key[:2], key + ".json")
+
+def http_cache_load(url):
+    try:
+        with open(_http_cache_path(url), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def http_cache_store(url, entry):
+    try:
+        write_file_atomic(_http_cache_path(url), json.dumps(entry))
+    except OSError:
+        pass
+
+HTTP_CACHED_HEADERS = ("ETag", "Last-Modified", "Link")
+
+# ===== GitHub: планировщик запросов =====
+# Все обращения к GitHub идут через github_request: token bucket по заголовкам
+# X-RateLimit-*, пауза по Retry-After, экспоненциальный повтор со случайной
+# задержкой, а одинаковые GET-запросы, уже находящиеся в полёте, не дублируются.
+
+GITHUB_MAX_RETRIES = 4
+GITHUB_BACKOFF_BASE = 1.0
+GITHUB_BACKOFF_CAP = 30.0
+GITHUB_MAX_WAIT = 90.0
+GITHUB_SECONDARY_WAIT = 60.0
+GITHUB_MAX_RATE = 10.0
+GITHUB_MIN_RATE = 0.05
+GITHUB_BURST = 10.0
+GITHUB_PACE_BELOW = 200
+
+class GitHubError(Exception):
+    pass
+
+github_quota = {"remaining": None, "limit": None, "reset": None, "paused_until": None}
+github_quota_listeners = []
+
+_github_bucket = {"tokens": GITHUB_BURST, "rate": GITHUB_MAX_RATE, "stamp": time.monotonic(), "blocked_until": 0.0}
+_github_cond = threading.Condition()
+_github_inflight = {}
+_github_inflight_lock = threading.Lock()
+
+def github_backoff(attempt):
+    import random
+    # "full jitter": случайная задержка от нуля до экспоненциального потолка
+    return random.uniform(0, min(GITHUB_BACKOFF_CAP, GITHUB_BACKOFF_BASE * 2 ** attempt))
+
+def github_limit_message():
+    reset = github_quota.get("paused_until") or github_quota.get("reset")
+    when = time.strftime("%H:%M:%S", time.localtime(reset)) if reset else "?"
+    return f"Превышен лимит запросов GitHub, повторите после {when}"
+
+def _notify_github_quota():
+    for listener in list(github_quota_listeners):
+        try:
+            listener(dict(github_quota))
+        except Exception:
+            pass
+
+def _github_acquire():
+    with _github_cond:
+        while True:
+            b = _github_bucket
+            now = time.monotonic()
+            b["tokens"] = min(GITHUB_BURST, b["tokens"] + (now - b["stamp"]) * b["rate"])
+            b["stamp"] = now
+            wait = b["blocked_until"] - now
+            if wait > GITHUB_MAX_WAIT:
+                # До сброса основного лимита ждать слишком долго — сразу сообщаем
+                raise GitHubError(github_limit_message())
+            if wait <= 0:
+                if b["tokens"] >= 1:
+                    b["tokens"] -= 1
+                    return
+                wait = (1 - b["tokens"]) / b["rate"]
+            _github_cond.wait(wait)
+
+def _is_rate_limited(resp):
+    if resp.status_code == 429:
+        return True
+    if resp.status_code != 403:
+        return False
+    if "Retry-After" in resp.headers or resp.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    return "rate limit" in resp.text.lower()
+
+def _github_observe(resp, attempt):
+    """Обновляет квоту и темп; для ответа "лимит превышен" возвращает паузу в секундах."""
+    import random
+    h = resp.headers
+    now = time.time()
+    wait = None
+    with _github_cond:
+        b = _github_bucket
+        if "X-RateLimit-Remaining" in h:
+            try:
+                remaining = int(h["X-RateLimit-Remaining"])
+                limit = int(h.get("X-RateLimit-Limit", 0))
+                reset = int(h.get("X-RateLimit-Reset", 0))
+            except ValueError:
+                remaining = None
+            if remaining is not None:
+                github_quota.update(remaining=remaining, limit=limit, reset=reset)
+                if remaining > GITHUB_PACE_BELOW:
+                    b["rate"] = GITHUB_MAX_RATE
+                else:
+                    # Остаток лимита растягиваем равномерно до момента сброса
+                    b["rate"] = max(GITHUB_MIN_RATE, remaining / max(1.0, reset - now))
+        if _is_rate_limited(resp):
+            retry_after = h.get("Retry-After", "")
+            if retry_after.isdigit():
+                wait = float(retry_after)
+            elif h.get("X-RateLimit-Remaining") == "0" and github_quota["reset"]:
+                wait = max(1.0, github_quota["reset"] - now)
+            else:
+                wait = GITHUB_SECONDARY_WAIT * 2 ** attempt
+            wait += random.uniform(0, 1)
+            b["blocked_until"] = max(b["blocked_until"], time.monotonic() + wait)
+            b["tokens"] = 0
+            github_quota["paused_until"] = now + wait
+        elif github_quota["paused_until"] and github_quota["paused_until"] <= now:
+            github_quota["paused_until"] = None
+    _notify_github_quota()
+    return wait
+
+def github_request(method, url, headers=None, timeout=15, **kwargs):
+    requests = get_requests()
+    session = get_github_session()
+    for attempt in range(GITHUB_MAX_RETRIES + 1):
+        _github_acquire()
+        try:
+            resp = session.request(method, url, headers=headers, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == GITHUB_MAX_RETRIES:
+                raise
+            time.sleep(github_backoff(attempt))
+            continue
+        wait = _github_observe(resp, attempt)
+        if wait is not None:
+            resp.close()
+            if attempt == GITHUB_MAX_RETRIES or wait > GITHUB_MAX_WAIT:
+                raise GitHubError(github_limit_message())
+            continue  # _github_acquire сам дождётся конца паузы
+        if resp.status_code >= 500 and attempt < GITHUB_MAX_RETRIES:
+            resp.close()
+            time.sleep(github_backoff(attempt))
+            continue
+        return resp
+
+def github_dedup(key, fn):
+    """Одинаковые запросы в полёте выполняются один раз, остальные ждут результат."""
+    with _github_inflight_lock:
+        slot = _github_inflight.get(key)
+        leader = slot is None
+        if leader:
+            slot = {"done": threading.Event(), "result": None, "error": None}
+            _github_inflight[key] = slot
+    if not leader:
+        slot["done"].wait()
+        if slot["error"] is not None:
+            raise slot["error"]
+        return slot["result"]
+    try:
+        slot["result"] = fn()
+        return slot["result"]
+    except BaseException as e:
+        slot["error"] = e
+        raise
+    finally:
+        with _github_inflight_lock:
+            _github_inflight.pop(key, None)
+        slot["done"].set()
+
+def github_get(url, accept=None, timeout=15, use_cache=True, revalidate=True):
+    """Возвращает (status, data, headers); data — разобранный JSON или None.
+
+    revalidate=False — для адресов по SHA: содержимое не меняется, кэш отдаётся без запроса.
+    """
+    key = ("GET", get_github_user(), url, accept, use_cache, revalidate)
+    return github_dedup(key, lambda: _github_get(url, accept, timeout, use_cache, revalidate))
+
+def _github_get(url, accept, timeout, use_cache, revalidate):
+    requests = get_requests()
+    headers = github_auth_headers()
+    if accept:
+        headers["Accept"] = accept
+    entry = http_cache_load(url) if use_cache else None
+    if entry and not revalidate:
+        return 200, entry["data"], requests.structures.CaseInsensitiveDict(entry.get("headers", {}))
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        resp = github_request("GET", url, headers=headers, timeout=timeout)
+    except (requests.RequestException, GitHubError):
+        # Нет сети или исчерпан лимит — лучше показать последний известный ответ
+        if entry:
+            return 200, entry["data"], requests.structures.CaseInsensitiveDict(entry.get("headers", {}))
+        raise
+    if resp.status_code == 304 and entry:
+        merged = requests.structures.CaseInsensitiveDict(entry.get("headers", {}))
+        merged.update(resp.headers)
+        return 200, entry["data"], merged
+    try:
+        data = resp.json()
+    except ValueError:
+        data = None
+    if use_cache and resp.status_code == 200 and data is not None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if etag or last_modified:
+            http_cache_store(url, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": {h: resp.headers[h] for h in HTTP_CACHED_HEADERS if h in resp.headers},
+                "data": data,
+            })
+    return resp.status_code, data, resp.headers
+
+# ===== GitHub API: REPOS & FILES & Content =====
+
+GITHUB_MAX_WORKERS = 4
+
+def parse_link_last_page(link):
+    # Link: <...&page=2>; rel="next", <...&page=7>; rel="last"
+    for part in (link or "").split(","):
+        target, _, rel = part.partition(";")
+        if 'rel="last"' in rel:
+            m = re.search(r"[?&]page=(\d+)", target)
+            if m:
+                return int(m.group(1))
+    return None
+
+def fetch_user_repos(on_page=None):
+    """Первая страница даёт число страниц из Link: rel="last", остальные грузятся параллельно.
+
+    on_page(page, names) вызывается из рабочих потоков по мере прихода страниц.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return []
+    user = get_github_user()
+    def page_url(page):
+        return f"{GITHUB_API}/users/{user}/repos?per_page=100&page={page}"
+    def page_names(data):
+        for repo in data:
+            github_repo_meta[repo["name"]] = {"default_branch": repo.get("default_branch")}
+        return [repo["name"] for repo in data]
+    status, data, headers = github_get(page_url(1))
+    if status != 200 or not data:
+        return []
+    pages = {1: page_names(data)}
+    if on_page:
+        on_page(1, pages[1])
+    last = parse_link_last_page(headers.get("Link")) or 1
+    limit_error = None
+    if last > 1:
+        with ThreadPoolExecutor(max_workers=min(GITHUB_MAX_WORKERS, last - 1)) as pool:
+            futures = {pool.submit(github_get, page_url(p)): p for p in range(2, last + 1)}
+            for fut in as_completed(futures):
+                page = futures[fut]
+                try:
+                    status, data, _ = fut.result()
+                except GitHubError as e:
+                    limit_error = e
+                    continue
+                except Exception:
+                    continue
+                if status == 200 and data:
+                    pages[page] = page_names(data)
+                    if on_page:
+                        on_page(page, pages[page])
+    if limit_error:
+        raise limit_error
+    return [name for page in sorted(pages) for name in pages[page]]
+
+def fetch_repo_tree(repo, path="", ref=None):
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return []
+    user = get_github_user()
+    url = f"{GITHUB_API}/repos/{user}/{repo}/contents/{path}" if path else f"{GITHUB_API}/repos/{user}/{repo}/contents"
+    if ref:
+        url += f"?ref={ref}"
+    status, data, _ = github_get(url)
+    if status != 200 or data is None:
+        return []
+    if isinstance(data, dict):
+        data = [data]
+    return data
+
+def fetch_file_content(repo, filepath, sha=None, ref=None):
+    """Текст файла или None. Известный SHA блоба из кэша открывается без сети."""
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return None
+    data = blob_cache_read(sha) if sha else None
+    if data is None and ref:
+        data = read_mirror_file(repo, ref, filepath, sha)
+    if data is None:
+        got = download_blob(repo, filepath, sha=sha, ref=ref)
+        if not got and sha and not blob_cache_has(sha):
+            # Мы могли дождаться чужой фоновой загрузки, которую отменили — качаем сами
+            got = download_blob(repo, filepath, sha=sha, ref=ref)
+        data = blob_cache_read(got) if got else None
+    if data is None:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+# ===== GitHub: кэш файлов по SHA блоба =====
+# Файлы хранятся по git blob SHA (как в самом git), поэтому один и тот же блоб из
+# любой ветки или репозитория скачивается один раз. Скачивание идёт потоком через
+# raw-тип ответа, без base64 в JSON и без ограничения на размер inline-содержимого.
+
+BLOB_CACHE_DIR = os.path.join(CACHE_DIR, "blobs")
+BLOB_CHUNK_SIZE = 64 * 1024
+GITHUB_RAW_ACCEPT = "application/vnd.github.raw+json"
+
+def git_blob_sha(data):
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+def git_blob_sha_file(path):
+    h = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def blob_cache_path(sha):
+    return os.path.join(BLOB_CACHE_DIR, sha[:2], sha)
+
+def blob_cache_has(sha):
+    return os.path.isfile(blob_cache_path(sha))
+
+def blob_cache_read(sha):
+    try:
+        with open(blob_cache_path(sha), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def blob_cache_store(data):
+    sha = git_blob_sha(data)
+    if not blob_cache_has(sha):
+        write_file_atomic(blob_cache_path(sha), data)
+    return sha
+
+def download_blob(repo, filepath, sha=None, ref=None, cancelled=None, owner=None):
+    """Скачивает файл в кэш кусками, возвращает SHA блоба или None.
+
+    cancelled() проверяется между кусками — так фоновые загрузки можно прервать.
+    """
+    if not sha:
+        return _download_blob(repo, filepath, sha, ref, cancelled, owner)
+    return github_dedup(("blob", sha), lambda: _download_blob(repo, filepath, sha, ref, cancelled, owner))
+
+def _download_blob(repo, filepath, sha, ref, cancelled, owner):
+    user = owner or get_github_user()
+    if sha:
+        url = f"{GITHUB_API}/repos/{user}/{repo}/git/blobs/{sha}"
+    else:
+        url = f"{GITHUB_API}/repos/{user}/{repo}/contents/{filepath}" + (f"?ref={ref}" if ref else "")
+    headers = github_auth_headers()
+    headers["Accept"] = GITHUB_RAW_ACCEPT
+    os.makedirs(BLOB_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=BLOB_CACHE_DIR, prefix=".part-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with github_request("GET", url, headers=headers, stream=True, timeout=30) as resp:
+                if resp.status_code != 200:
+                    return None
+                for chunk in resp.iter_content(BLOB_CHUNK_SIZE):
+                    if cancelled and cancelled():
+                        return None
+                    f.write(chunk)
+        actual = git_blob_sha_file(tmp)
+        if sha and actual != sha:
+            return None
+        os.makedirs(os.path.dirname(blob_cache_path(actual)), exist_ok=True)
+        os.replace(tmp, blob_cache_path(actual))
+        return actual
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+# ===== GitHub: упреждающая загрузка мелких файлов =====
+# Пока пользователь смотрит на список папки, мелкие текстовые файлы из неё тихо
+# скачиваются в кэш блобов — в порядке вероятности, что их откроют следующими.
+# Переход в другую папку или закрытие окна отменяет текущую загрузку.
+
+PREFETCH_MAX_FILE_SIZE = 128 * 1024
+PREFETCH_BUDGET = 1024 * 1024
+PREFETCH_MAX_FILES = 20
+PREFETCH_WORKERS = 2
+PREFETCH_FIRST_NAMES = ("__main__.py", "main.py", "app.py", "__init__.py", "setup.py", "readme.md")
+PREFETCH_TEXT_EXTENSIONS = (".py", ".pyw", ".pyi", ".md", ".txt", ".rst", ".toml", ".cfg", ".ini", ".json", ".yml", ".yaml")
+
+_prefetch_generation = [0]
+_prefetch_lock = threading.Lock()
+
+def prefetch_priority(item):
+    name = item["name"].lower()
+    ext = os.path.splitext(name)[1]
+    if name in PREFETCH_FIRST_NAMES:
+        rank = PREFETCH_FIRST_NAMES.index(name)
+    elif ext in (".py", ".pyw"):
+        rank = len(PREFETCH_FIRST_NAMES)
+    else:
+        rank = len(PREFETCH_FIRST_NAMES) + 1 + PREFETCH_TEXT_EXTENSIONS.index(ext)
+    return (rank, item.get("size", 0), name)
+
+def prefetch_candidates(items):
+    eligible = [
+        itm for itm in items
+        if itm.get("type") == "file" and itm.get("sha")
+        and os.path.splitext(itm["name"].lower())[1] in PREFETCH_TEXT_EXTENSIONS
+        and 0 < itm.get("size", 0) <= PREFETCH_MAX_FILE_SIZE
+        and not blob_cache_has(itm["sha"])
+    ]
+    picked = []
+    budget = PREFETCH_BUDGET
+    for itm in sorted(eligible, key=prefetch_priority):
+        if len(picked) >= PREFETCH_MAX_FILES:
+            break
+        if itm["size"] <= budget:
+            picked.append(itm)
+            budget -= itm["size"]
+    return picked
+
+def cancel_prefetch():
+    with _prefetch_lock:
+        _prefetch_generation[0] += 1
+
+def start_prefetch(repo, items):
+    with _prefetch_lock:
+        _prefetch_generation[0] += 1
+        generation = _prefetch_generation[0]
+    queue = prefetch_candidates(items)
+    if not queue:
+        return
+    def cancelled():
+        return _prefetch_generation[0] != generation
+    def worker():
+        while not cancelled():
+            with _prefetch_lock:
+                if not queue:
+                    return
+                itm = queue.pop(0)
+            try:
+                download_blob(repo, itm["path"], sha=itm["sha"], cancelled=cancelled)
+            except Exception:
+                return
+    for _ in range(min(PREFETCH_WORKERS, len(queue))):
+        threading.Thread(target=worker, daemon=True).start()
+
+# ===== GitHub: индекс дерева репозитория =====
+# Всё дерево ветки забирается одним запросом Git Trees API (recursive=1) и
+# раскладывается по папкам в памяти. Навигация по папкам после этого идёт без сети;
+# индекс перестраивается, только когда меняется SHA головы ветки.
+
+github_repo_meta = {}
+_repo_index_cache = {}
+_repo_index_lock = threading.Lock()
+
+GIT_TREE_TYPES = {"blob": "file", "tree": "dir", "commit": "submodule"}
+
+def sort_tree_items(items):
+    items.sort(key=lambda x: (x['type'] != 'dir', x['name'].lower()))
+    return items
+
+def get_repo_default_branch(repo):
+    meta = github_repo_meta.get(repo)
+    if meta and meta.get("default_branch"):
+        return meta["default_branch"]
+    status, data, _ = github_get(f"{GITHUB_API}/repos/{get_github_user()}/{repo}")
+    if status != 200 or not isinstance(data, dict):
+        return None
+    github_repo_meta[repo] = {"default_branch": data.get("default_branch")}
+    return data.get("default_branch")
+
+def fetch_branch_head(repo, branch):
+    # Условный запрос: пока ветка не двигалась, GitHub отвечает 304
+    status, data, _ = github_get(f"{GITHUB_API}/repos/{get_github_user()}/{repo}/git/ref/heads/{branch}")
+    if status != 200 or not isinstance(data, dict):
+        return None
+    return data.get("object", {}).get("sha")
+
+def build_tree_index(entries):
+    dirs = {"": []}
+    for e in entries:
+        parent, _, name = e["path"].rpartition("/")
+        typ = GIT_TREE_TYPES.get(e["type"], e["type"])
+        if e.get("mode") == "120000":
+            typ = "symlink"
+        dirs.setdefault(parent, []).append({
+            "name": name, "path": e["path"], "type": typ,
+            "sha": e.get("sha"), "size": e.get("size", 0), "mode": e.get("mode"),
+        })
+        if typ == "dir":
+            dirs.setdefault(e["path"], [])
+    for items in dirs.values():
+        sort_tree_items(items)
+    return dirs
+
+def get_repo_index(repo):
+    if not HAS_REQUESTS:
+        return None
+    branch = get_repo_default_branch(repo)
+    if not branch:
+        return None
+    head = fetch_branch_head(repo, branch)
+    if not head:
+        return None
+    key = (get_github_user(), repo)
+    with _repo_index_lock:
+        cached = _repo_index_cache.get(key)
+    if cached and cached["sha"] == head:
+        return cached
+    url = f"{GITHUB_API}/repos/{get_github_user()}/{repo}/git/trees/{head}?recursive=1"
+    status, data, _ = github_get(url, revalidate=False)
+    if status != 200 or not isinstance(data, dict):
+        return None
+    index = {
+        "repo": repo, "branch": branch, "sha": head,
+        # Для огромных репозиториев GitHub обрезает ответ — тогда папки дочитываются по одной
+        "truncated": bool(data.get("truncated")),
+        "complete": set(),
+        "dirs": build_tree_index(data.get("tree", [])),
+    }
+    with _repo_index_lock:
+        _repo_index_cache[key] = index
+    return index
+
+def repo_index_listing(index, path):
+    """Содержимое папки из индекса или None, если его нужно дочитать из сети."""
+    items = index["dirs"].get(path)
+    if items is not None and (not index["truncated"] or path in index["complete"]):
+        return items
+    return None
+
+def repo_index_item(index, path):
+    parent, _, name = path.rpartition("/")
+    for itm in index["dirs"].get(parent, ()):
+        if itm["name"] == name:
+            return itm
+    return None
+
+def repo_index_fill(index, path):
+    items = sort_tree_items(fetch_repo_tree(index["repo"], path, ref=index["sha"]))
+    with _repo_index_lock:
+        index["dirs"][path] = items
+        index["complete"].add(path)
+    return items
+
+# ===== GitHub: локальное зеркало репозитория =====
+# Архив репозитория (zipball) скачивается один раз и распаковывается в кэш по SHA
+# коммита. Рядом строится триграммный индекс текстовых файлов: по нему поиск по
+# всему репозиторию и открытие файлов работают с диска, без сети.
+
+MIRROR_DIR = os.path.join(CACHE_DIR, "mirrors")
+MIRROR_INDEX_FILE = ".pythontoolpack_index.json"
+MIRROR_MAX_TEXT_SIZE = 1024 * 1024
+MIRROR_KEEP = 2
+
+_mirror_index_cache = {}
+_mirror_index_lock = threading.Lock()
+
+def mirror_path(repo, sha):
+    return os.path.join(MIRROR_DIR, get_github_user(), repo, sha)
+
+def mirror_exists(repo, sha):
+    return bool(sha) and os.path.isfile(os.path.join(mirror_path(repo, sha), MIRROR_INDEX_FILE))
+
+def text_trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def build_mirror_index(folder):
+    entries, files, postings = [], [], {}
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            full = os.path.join(dirpath, fn)
+            rel = os.path.relpath(full, folder).replace(os.sep, "/")
+            if rel == MIRROR_INDEX_FILE:
+                continue
+            with open(full, "rb") as f:
+                data = f.read()
+            entries.append({"path": rel, "type": "blob", "sha": git_blob_sha(data), "size": len(data)})
+            if len(data) > MIRROR_MAX_TEXT_SIZE or b"\0" in data[:8192]:
+                continue
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                continue
+            fid = len(files)
+            files.append(rel)
+            for gram in text_trigrams(text.lower()):
+                postings.setdefault(gram, []).append(fid)
+    return {"entries": entries, "files": files, "postings": postings}
+
+def _safe_extract(zf, dest):
+    # GitHub кладёт всё в папку "<owner>-<repo>-<sha>/" — срезаем её и не даём выйти за dest
+    root = os.path.realpath(dest)
+    for info in zf.infolist():
+        parts = info.filename.split("/", 1)
+        if len(parts) < 2 or not parts[1]:
+            continue
+        target = os.path.realpath(os.path.join(dest, parts[1]))
+        if not target.startswith(root + os.sep):
+            continue
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with zf.open(info) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, BLOB_CHUNK_SIZE)
+
+def mirror_repo(repo, sha, progress=None):
+    """Скачивает и индексирует зеркало; progress(text) вызывается из рабочего потока."""
+    import zipfile
+    dest = mirror_path(repo, sha)
+    if mirror_exists(repo, sha):
+        return dest
+    parent = os.path.dirname(dest)
+    os.makedirs(parent, exist_ok=True)
+    url = f"{GITHUB_API}/repos/{get_github_user()}/{repo}/zipball/{sha}"
+    fd, archive = tempfile.mkstemp(dir=parent, prefix=".zip-")
+    work = tempfile.mkdtemp(dir=parent, prefix=".part-")
+    try:
+        received, next_report = 0, 0
+        with os.fdopen(fd, "wb") as f:
+            with github_request("GET", url, headers=github_auth_headers(), stream=True, timeout=60) as resp:
+                if resp.status_code != 200:
+                    raise GitHubError(f"Не удалось скачать архив, код {resp.status_code}")
+                for chunk in resp.iter_content(BLOB_CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+                    if progress and received >= next_report:
+                        progress(f"Скачано {received / 1024 / 1024:.1f} МБ")
+                        next_report += 1024 * 1024
+        if progress:
+            progress("Распаковка...")
+        with zipfile.ZipFile(archive) as zf:
+            _safe_extract(zf, work)
+        if progress:
+            progress("Индексация...")
+        index = build_mirror_index(work)
+        with open(os.path.join(work, MIRROR_INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        if os.path.isdir(dest):
+            shutil.rmtree(dest)
+        os.replace(work, dest)
+        _mirror_index_cache[dest] = index
+    finally:
+        os.unlink(archive)
+        shutil.rmtree(work, ignore_errors=True)
+    prune_mirrors(repo)
+    return dest
+
+def _repo_mirrors(repo):
+    folder = os.path.join(MIRROR_DIR, get_github_user(), repo)
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return []
+    dirs = [os.path.join(folder, n) for n in names
+            if not n.startswith(".") and os.path.isfile(os.path.join(folder, n, MIRROR_INDEX_FILE))]
+    return sorted(dirs, key=os.path.getmtime, reverse=True)
+
+def prune_mirrors(repo):
+    for old in _repo_mirrors(repo)[MIRROR_KEEP:]:
+        _mirror_index_cache.pop(old, None)
+        shutil.rmtree(old, ignore_errors=True)
+
+def load_mirror_index(folder):
+    """Индекс зеркала из памяти или с диска. JSON бывает в десятки МБ — вызывать не из потока Tk."""
+    with _mirror_index_lock:
+        index = _mirror_index_cache.get(folder)
+        if index is None:
+            with open(os.path.join(folder, MIRROR_INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            _mirror_index_cache[folder] = index
+        return index
+
+def preload_mirror_index(repo, sha):
+    # Первый поиск не должен ждать разбора индекса — читаем его заранее в фоне
+    if mirror_path(repo, sha) in _mirror_index_cache:
+        return
+    def load():
+        try:
+            load_mirror_index(mirror_path(repo, sha))
+        except (OSError, ValueError):
+            pass
+    threading.Thread(target=load, daemon=True).start()
+
+def mirror_repo_index(repo):
+    """Индекс дерева из последнего зеркала — для работы без сети."""
+    mirrors = _repo_mirrors(repo)
+    if not mirrors:
+        return None
+    folder = mirrors[0]
+    entries = list(load_mirror_index(folder)["entries"])
+    dirs = set()
+    for e in entries:
+        parent = e["path"].rpartition("/")[0]
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = parent.rpartition("/")[0]
+    entries += [{"path": d, "type": "tree"} for d in dirs]
+    return {
+        "repo": repo, "branch": None, "sha": os.path.basename(folder),
+        "truncated": False, "complete": set(), "offline": True,
+        "dirs": build_tree_index(entries),
+    }
+
+def read_mirror_file(repo, sha, filepath, blob_sha=None):
+    if not mirror_exists(repo, sha):
+        return None
+    try:
+        with open(os.path.join(mirror_path(repo, sha), *filepath.split("/")), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # export-subst и eol-атрибуты могут изменить файл в архиве — тогда берём настоящий блоб
+    if blob_sha and git_blob_sha(data) != blob_sha:
+        return None
+    return data
+
+def search_mirror(repo, sha, query, limit=500):
+    """Список (путь, номер строки, строка) для подстроки query без учёта регистра."""
+    folder = mirror_path(repo, sha)
+    index = load_mirror_index(folder)
+    needle = query.lower()
+    grams = sorted(text_trigrams(needle), key=lambda g: len(index["postings"].get(g, ())))
+    if grams:
+        candidates = set(index["postings"].get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(index["postings"].get(gram, ()))
+    else:
+        candidates = range(len(index["files"]))
+    results = []
+    for fid in sorted(candidates):
+        rel = index["files"][fid]
+        try:
+            with open(os.path.join(folder, *rel.split("/")), "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    if needle in line.lower():
+                        results.append((rel, lineno, line.strip()))
+                        if len(results) >= limit:
+                            return results
+        except (OSError, UnicodeDecodeError):
+            continue
+    return results
+
+# ===== GitHub: сохранение изменений одним коммитом =====
+# Изменённые файлы копятся в github_pending_changes и уходят одним коммитом через
+# Git Data API: дерево (содержимое файлов передаётся прямо в нём, GitHub сам
+# создаёт блобы), коммит и перемещение ветки. Сколько бы файлов ни было, это
+# три пишущих запроса. SHA, записанный при открытии файла, служит для проверки
+# конфликтов: если файл на ветке с тех пор изменился, коммит не создаётся.
+
+GITHUB_COMMIT_ATTEMPTS = 3
+
+github_pending_changes = {}
+
+def github_write(method, url, body):
+    resp = github_request(method, url, headers=github_auth_headers(), json=body, timeout=30)
+    try:
+        data = resp.json()
+    except ValueError:
+        data = None
+    return resp.status_code, data
+
+def _paths_at_tree(repo, tree_sha, paths):
+    """{путь: (sha, mode)} для файлов, существующих в коммите."""
+    base = f"{GITHUB_API}/repos/{get_github_user()}/{repo}"
+    status, data, _ = github_get(f"{base}/git/trees/{tree_sha}?recursive=1", revalidate=False)
+    if status == 200 and isinstance(data, dict) and not data.get("truncated"):
+        wanted = set(paths)
+        return {e["path"]: (e["sha"], e["mode"]) for e in data.get("tree", []) if e["path"] in wanted}
+    # Дерево слишком большое для одного ответа — спускаемся по папкам нужных путей.
+    # Деревья неизменяемы по SHA, так что общие папки запрашиваются один раз.
+    trees = {"": tree_sha}
+    listings = {}
+    def entries(folder):
+        if folder not in listings:
+            listings[folder] = {}
+            sha = trees.get(folder)
+            if sha:
+                status, data, _ = github_get(f"{base}/git/trees/{sha}", revalidate=False)
+                if status == 200 and isinstance(data, dict):
+                    listings[folder] = {e["path"]: e for e in data.get("tree", [])}
+        return listings[folder]
+    found = {}
+    for path in paths:
+        folder = ""
+        parts = path.split("/")
+        for part in parts[:-1]:
+            entry = entries(folder).get(part)
+            child = f"{folder}/{part}" if folder else part
+            if entry and entry["type"] == "tree":
+                trees.setdefault(child, entry["sha"])
+            folder = child
+        entry = entries(folder).get(parts[-1])
+        if entry and entry["type"] == "blob":
+            found[path] = (entry["sha"], entry["mode"])
+    return found
+
+def commit_files_to_github(repo, branch, changes, message):
+    """changes: [{"path", "content", "base_sha"}]. Возвращает (sha коммита, {путь: sha блоба})."""
+    base = f"{GITHUB_API}/repos/{get_github_user()}/{repo}"
+    for attempt in range(GITHUB_COMMIT_ATTEMPTS):
+        status, ref, _ = github_get(f"{base}/git/ref/heads/{branch}", use_cache=False)
+        if status != 200 or not isinstance(ref, dict):
+            raise GitHubError(f"Ветка {branch} не найдена (код {status})")
+        head = ref["object"]["sha"]
+        status, commit, _ = github_get(f"{base}/git/commits/{head}", revalidate=False)
+        if status != 200 or not isinstance(commit, dict):
+            raise GitHubError(f"Не удалось прочитать коммит {head[:7]} (код {status})")
+        current = _paths_at_tree(repo, commit["tree"]["sha"], [c["path"] for c in changes])
+        conflicts, entries, blobs = [], [], {}
+        for change in changes:
+            data = change["content"].encode("utf-8")
+            new_sha = git_blob_sha(data)
+            remote_sha, mode = current.get(change["path"], (None, "100644"))
+            if remote_sha == new_sha:
+                continue
+            if remote_sha != change["base_sha"]:
+                conflicts.append(change["path"])
+                continue
+            blobs[change["path"]] = new_sha
+            entries.append({"path": change["path"], "mode": mode, "type": "blob", "content": change["content"]})
+        if conflicts:
+            raise GitHubError("Файлы изменились на GitHub после открытия:\n" + "\n".join(conflicts))
+        if not entries:
+            return None, {}
+        status, tree = github_write("POST", f"{base}/git/trees", {"base_tree": commit["tree"]["sha"], "tree": entries})
+        if status != 201:
+            raise GitHubError(f"Не удалось создать дерево (код {status})")
+        status, new_commit = github_write("POST", f"{base}/git/commits",
+                                          {"message": message, "tree": tree["sha"], "parents": [head]})
+        if status != 201:
+            raise GitHubError(f"Не удалось создать коммит (код {status})")
+        status, _ = github_write("PATCH", f"{base}/git/refs/heads/{branch}", {"sha": new_commit["sha"], "force": False})
+        if status == 200:
+            for change in changes:
+                if change["path"] in blobs:
+                    blob_cache_store(change["content"].encode("utf-8"))
+            return new_commit["sha"], blobs
+        if status != 422:
+            raise GitHubError(f"Не удалось обновить ветку {branch} (код {status})")
+        # 422: ветку успели сдвинуть — проверяем конфликты заново на новой голове
+    raise GitHubError(f"Ветка {branch} постоянно меняется, попробуйте позже")
+
+# ===== Обновление приложения =====
+# Версии сравниваются по git blob SHA: локальный файл хэшируется на месте, а SHA
+# на GitHub берётся из корневого дерева ветки условным запросом (304, пока ничего
+# не менялось). Файл скачивается только при расхождении и подменяется атомарно.
+
+UPDATE_OWNER = "Universalingnebula"
+UPDATE_REPO = "lazylibs2"
+UPDATE_PATH = "lazylibs2_ultimate.py"
+UPDATE_BRANCH = "main"
+UPDATE_FALLBACK_FILE = "pythontoolpack_new.py"
+UPDATE_CHECK_INTERVAL_MS = 6 * 60 * 60 * 1000
+UPDATE_CHECK_KEY = "auto_update_check"
+
+update_check_job = [None]
+
+def local_app_blob_shas():
+    """SHA запущенного файла как есть и с LF-переводами строк (так его хранит git)."""
+    if getattr(sys, "frozen", False):
+        return set()
+    try:
+        with open(os.path.abspath(__file__), "rb") as f:
+            data = f.read()
+    except OSError:
+        return set()
+    return {git_blob_sha(data), git_blob_sha(data.replace(b"\r\n", b"\n"))}
+
+def fetch_remote_app_sha():
+    url = f"{GITHUB_API}/repos/{UPDATE_OWNER}/{UPDATE_REPO}/git/trees/{UPDATE_BRANCH}"
+    status, data, _ = github_get(url)
+    if status != 200 or not isinstance(data, dict):
+        raise GitHubError(f"Не удалось проверить обновления. Код: {status}")
+    for entry in data.get("tree", []):
+        if entry["path"] == UPDATE_PATH:
+            return entry["sha"]
+    raise GitHubError(f"{UPDATE_PATH} не найден в {UPDATE_OWNER}/{UPDATE_REPO}")
+
+def is_update_available():
+    remote = fetch_remote_app_sha()
+    return remote not in local_app_blob_shas(), remote
+
+def download_and_apply_update(remote_sha):
+    """Возвращает (путь, заменён ли запущенный файл)."""
+    data = blob_cache_read(remote_sha)
+    if data is None:
+        got = download_blob(UPDATE_REPO, UPDATE_PATH, sha=remote_sha, owner=UPDATE_OWNER)
+        data = blob_cache_read(got) if got else None
+    if data is None:
+        raise GitHubError("Не удалось скачать новую версию")
+    if getattr(sys, "frozen", False):
+        write_file_atomic(UPDATE_FALLBACK_FILE, data)
+        return os.path.abspath(UPDATE_FALLBACK_FILE), False
+    target = os.path.abspath(__file__)
+    compile(data, target, "exec")  # битый файл не должен заменить рабочий
+    shutil.copy2(target, target + ".bak")
+    write_file_atomic(target, data)
+    return target, True
+
+def check_update():
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return
+    if not is_github_authenticated():
+        messagebox.showwarning("Обновление", "Для обновления авторизуйтесь через GitHub!")
+        return
+    btn_check_update.config(state="disabled")
+    def worker():
+        try:
+            available, remote_sha = is_update_available()
+            error = None
+        except Exception as e:
+            available, remote_sha, error = False, None, e
+        root.after(0, lambda: on_checked(available, remote_sha, error))
+    def on_checked(available, remote_sha, error):
+        btn_check_update.config(state="normal")
+        if error:
+            messagebox.showerror("Обновление", f"Ошибка запроса: {error}")
+            return
+        if not available:
+            btn_check_update.config(text="Проверить обновления", fg="black")
+            messagebox.showinfo("Обновление", "У вас последняя версия.")
+            return
+        if not messagebox.askyesno("Обновление", "Доступна новая версия. Скачать и установить?"):
+            return
+        btn_check_update.config(state="disabled")
+        def apply():
+            try:
+                path, replaced = download_and_apply_update(remote_sha)
+                msg = (f"Приложение обновлено ({path}), копия старой версии — .bak.\nПерезапустите приложение."
+                       if replaced else f"Скачана новая версия как {path}\nПерезапустите приложение вручную для обновления.")
+                root.after(0, lambda: (btn_check_update.config(state="normal", text="Проверить обновления", fg="black"),
+                                       messagebox.showinfo("Обновление", msg)))
+            except Exception as e:
+                err = str(e)
+                root.after(0, lambda: (btn_check_update.config(state="normal"),
+                                       messagebox.showerror("Обновление", f"Не удалось обновить: {err}")))
+        threading.Thread(target=apply).start()
+    threading.Thread(target=worker).start()
+
+def schedule_update_check(delay_ms=UPDATE_CHECK_INTERVAL_MS):
+    # Тихая фоновая проверка: только подсвечивает кнопку, окон не открывает
+    def tick():
+        if not config.get(UPDATE_CHECK_KEY):
+            return
+        if HAS_REQUESTS and is_github_authenticated():
+            def worker():
+                try:
+                    available, _ = is_update_available()
+                except Exception:
+                    return
+                if available:
+                    root.after(0, lambda: btn_check_update.config(text="Доступно обновление!", fg="red"))
+            threading.Thread(target=worker, daemon=True).start()
+        schedule_update_check()
+    if update_check_job[0]:
+        root.after_cancel(update_check_job[0])
+    update_check_job[0] = root.after(delay_ms, tick)
+
+def toggle_auto_update_check():
+    config[UPDATE_CHECK_KEY] = auto_update_var.get()
+    save_config(config)
+    if auto_update_var.get():
+        schedule_update_check(1000)
+
+# ===== Инвентаризация пакетов =====
+# Список установленных дистрибутивов читается из их метаданных (importlib.metadata)
+# вместо запуска pip: в своём процессе, если выбран текущий интерпретатор, или
+# маленьким скриптом-помощником для другого Python. Результат кэшируется в памяти и
+# на диске и пересобирается, только когда меняются папки site-packages или их RECORD.
+
+INVENTORY_CACHE_DIR = os.path.join(CACHE_DIR, "inventory")
+INVENTORY_HELPER_TIMEOUT = 60
+INVENTORY_FORMAT = 3
+
+INVENTORY_HELPER = r"""
+import json, os, re, site, sys
+try:
+    from importlib import metadata
+except ImportError:
+    import importlib_metadata as metadata
+
+def read_installer(path):
+    try:
+        return (path / "INSTALLER").read_text(encoding="utf-8").strip().lower()
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+def collect():
+    seen = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        key = re.sub(r"[-_.]+", "-", name).lower()
+        if key in seen:
+            continue
+        path = getattr(dist, "_path", None)
+        installer = read_installer(path) if path and path.name.endswith(".dist-info") else ""
+        seen[key] = {
+            "name": name,
+            "key": key,
+            "version": dist.version,
+            "requires": dist.requires or [],
+            "location": str(path.parent) if path else "",
+            "metadata_path": str(path) if path else "",
+            "installer": installer,
+            # REQUESTED кладёт pip, если пакет просили явно, а не тянули зависимостью.
+            # conda, poetry и пакеты дистрибутива его не пишут — их пакеты считаем запрошенными
+            "requested": installer != "pip" or (path / "REQUESTED").exists(),
+        }
+    dirs = {p["location"] for p in seen.values() if p["location"]}
+    try:
+        dirs.update(site.getsitepackages())
+    except AttributeError:
+        pass
+    if site.ENABLE_USER_SITE is not False:
+        dirs.add(site.getusersitepackages())
+    return {
+        "executable": sys.executable,
+        "version": sys.version.split()[0],
+        "site_dirs": sorted(dirs),
+        "packages": sorted(seen.values(), key=lambda p: p["key"]),
+    }
+
+if __name__ == "__main__":
+    sys.stdout.write(json.dumps(collect()))
+"""
+
+_inventory_cache = {}
+_inventory_locks = {}
+_inventory_lock = threading.Lock()
+
+def _inventory_key_lock(key):
+    # Замок на каждый интерпретатор: медленный сбор у одного не задерживает остальные
+    with _inventory_lock:
+        return _inventory_locks.setdefault(key, threading.Lock())
+
+def canonical_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def python_key(python):
+    # Без realpath: python из venv — симлинк на базовый, но окружение у него своё
+    return os.path.normcase(os.path.abspath(python))
+
+def is_current_python(python):
+    return not getattr(sys, "frozen", False) and python_key(python) == python_key(sys.executable)
+
+def _inventory_cache_path(python):
+    digest = hashlib.sha256(python_key(python).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INVENTORY_CACHE_DIR, digest + ".json")
+
+def inventory_signature(python, site_dirs):
+    # mtime папок меняется при установке/удалении, mtime RECORD — при переустановке той же версии
+    try:
+        sig = [[python, os.stat(python).st_mtime_ns]]
+    except OSError:
+        sig = [[python, None]]
+    for folder in site_dirs:
+        try:
+            sig.append([folder, os.stat(folder).st_mtime_ns])
+            names = sorted(os.listdir(folder))
+        except OSError:
+            sig.append([folder, None])
+            continue
+        for n in names:
+            if n.endswith((".dist-info", ".egg-info")):
+                meta = os.path.join(folder, n)
+                record = os.path.join(meta, "RECORD")
+                try:
+                    sig.append([n, os.stat(record if os.path.exists(record) else meta).st_mtime_ns])
+                except OSError:
+                    pass
+    return sig
+
+def _collect_inventory(python):
+    if is_current_python(python):
+        importlib.invalidate_caches()
+        ns = {"__name__": "pythontoolpack_inventory"}
+        exec(INVENTORY_HELPER, ns)
+        return ns["collect"]()
+    result = subprocess.run([python, "-c", INVENTORY_HELPER], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, timeout=INVENTORY_HELPER_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"код {result.returncode}")
+    return json.loads(result.stdout)
+
+def _load_inventory_from_disk(python):
+    try:
+        with open(_inventory_cache_path(python), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def get_inventory(python=None, force=False):
+    """Словарь с ключами executable, version, site_dirs, packages, signature."""
+    python = python or get_default_python()
+    key = python_key(python)
+    with _inventory_key_lock(key):
+        entry = _inventory_cache.get(key) or _load_inventory_from_disk(python)
+        # Подпись снимаем до чтения метаданных: если что-то поставят во время сбора,
+        # она разойдётся с диском и следующий вызов пересоберёт список
+        signature = inventory_signature(python, entry["site_dirs"]) if entry else None
+        if entry and not force and signature == entry["signature"] and entry.get("format") == INVENTORY_FORMAT:
+            _inventory_cache[key] = entry
+            return entry
+        collected = _collect_inventory(python)
+        if signature is None or entry["site_dirs"] != collected["site_dirs"]:
+            signature = inventory_signature(python, collected["site_dirs"])
+        collected["signature"] = signature
+        collected["format"] = INVENTORY_FORMAT
+        _inventory_cache[key] = collected
+        try:
+            write_file_atomic(_inventory_cache_path(python), json.dumps(collected))
+        except OSError:
+            pass
+        return collected
+
+# ===== Интерпретаторы Python =====
+# Поиск всех Python на машине: PATH, py-лаунчер Windows, pyenv, conda, virtualenvwrapper
+# и venv рядом с рабочей папкой. Кандидаты опрашиваются параллельно, дубликаты (один
+# и тот же sys.prefix под разными именами) отбрасываются, результат хранится на диске.
+# Инвентарь у каждого интерпретатора свой (get_inventory), так что переключение мгновенное.
+
+INTERPRETERS_FILE = os.path.join(CACHE_DIR, "interpreters.json")
+INTERPRETER_PROBE_TIMEOUT = 10
+INTERPRETER_WORKERS = 8
+INTERPRETER_PROBE = "import json, sys; print(json.dumps([sys.version.split()[0], sys.prefix, getattr(sys, 'base_prefix', sys.prefix), sys.executable]))"
+
+_PYTHON_NAME_RE = re.compile(r"^python(\d(\.\d+)?)?(\.exe)?$", re.I)
+
+def _env_python(env_dir):
+    if os.name == "nt":
+        return [os.path.join(env_dir, "python.exe"), os.path.join(env_dir, "Scripts", "python.exe")]
+    return [os.path.join(env_dir, "bin", "python")]
+
+def _subdirs(folder):
+    try:
+        return [os.path.join(folder, d) for d in os.listdir(folder)]
+    except OSError:
+        return []
+
+def candidate_pythons():
+    found = []
+    for folder in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            continue
+        found += [os.path.join(folder, n) for n in names if _PYTHON_NAME_RE.match(n)]
+    if os.name == "nt":
+        try:
+            out = subprocess.run(["py", "-0p"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                 text=True, timeout=INTERPRETER_PROBE_TIMEOUT).stdout
+            found += re.findall(r"([A-Za-z]:\\[^\r\n]*?python\.exe)", out, re.I)
+        except (OSError, subprocess.SubprocessError):
+            pass
+        local = os.environ.get("LOCALAPPDATA", "")
+        for d in _subdirs(os.path.join(local, "Programs", "Python")):
+            found += _env_python(d)
+    home = os.path.expanduser("~")
+    env_roots = [os.path.join(home, ".pyenv", "versions"), os.path.join(home, ".virtualenvs"),
+                 os.environ.get("WORKON_HOME", "")]
+    for conda in ("anaconda3", "miniconda3", "miniforge3", "mambaforge"):
+        env_roots.append(os.path.join(home, conda, "envs"))
+        found += _env_python(os.path.join(home, conda))
+    for root_dir in filter(None, env_roots):
+        for d in _subdirs(root_dir):
+            found += _env_python(d)
+    for name in (".venv", "venv", "env"):
+        found += _env_python(os.path.join(os.getcwd(), name))
+    if config.get("python_path"):
+        found.append(config["python_path"])
+    if not getattr(sys, "frozen", False):
+        found.append(sys.executable)
+    result, seen = [], set()
+    for path in found:
+        key = python_key(path)
+        if key not in seen and os.path.isfile(path) and os.access(path, os.X_OK):
+            seen.add(key)
+            result.append(os.path.abspath(path))
+    return result
+
+def probe_interpreter(path):
+    try:
+        out = subprocess.run([path, "-c", INTERPRETER_PROBE], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             text=True, timeout=INTERPRETER_PROBE_TIMEOUT)
+        version, prefix, base_prefix, executable = json.loads(out.stdout.strip().splitlines()[-1])
+    except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+        return None
+    return {"path": path, "version": version, "prefix": prefix, "venv": prefix != base_prefix,
+            "executable": executable}
+
+def discover_interpreters():
+    """Опрашивает всех кандидатов параллельно и сохраняет список; один элемент на sys.prefix."""
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=INTERPRETER_WORKERS) as pool:
+        probed = [info for info in pool.map(probe_interpreter, candidate_pythons()) if info]
+    unique = {}
+    for info in probed:
+        # Из нескольких имён одного окружения берём настоящий файл (не shim pyenv), затем самое короткое
+        key = os.path.normcase(os.path.realpath(info["prefix"]))
+        info["rank"] = (os.path.realpath(info["path"]) != os.path.realpath(info["executable"]), len(info["path"]))
+        if key not in unique or info["rank"] < unique[key]["rank"]:
+            unique[key] = info
+    interpreters = sorted(unique.values(), key=lambda i: (version_sort_key(i["version"]), i["path"]), reverse=True)
+    for info in interpreters:
+        del info["rank"]
+    try:
+        write_file_atomic(INTERPRETERS_FILE, json.dumps(interpreters))
+    except OSError:
+        pass
+    return interpreters
+
+def load_interpreters():
+    try:
+        with open(INTERPRETERS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def interpreter_label(info):
+    name = os.path.basename(info["prefix"].rstrip("/\\")) if info["venv"] else ""
+    return f"Python {info['version']}" + (f" ({name})" if name else "") + f" — {info['path']}"
+
+def _inventory_or_none(python):
+    try:
+        return get_inventory(python)
+    except Exception:
+        # Например, Python без importlib.metadata
+        return None
+
+def compare_inventories(pythons):
+    """Инвентари нескольких Python параллельно: ({ключ пакета: {name, versions}}, список недоступных)."""
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=INTERPRETER_WORKERS) as pool:
+        inventories = list(pool.map(_inventory_or_none, pythons))
+    table = {}
+    failed = [p for p, inv in zip(pythons, inventories) if inv is None]
+    for i, inventory in enumerate(inventories):
+        for pkg in (inventory or {}).get("packages", []):
+            row = table.setdefault(pkg["key"], {"name": pkg["name"], "versions": [None] * len(pythons)})
+            row["versions"][i] = pkg["version"]
+    return table, failed
+
+# ----- Подробности о пакете -----
+# Всё читается прямо из .dist-info/.egg-info (METADATA, RECORD) без запуска pip.
+# Кэш в памяти по (интерпретатор, имя, версия): новая версия — новый ключ.
+# «Нужен для» зависит от других пакетов, поэтому берётся из графа при каждом вызове.
+
+DETAILS_FIELDS = (("Summary", "Описание"), ("Home-page", "Сайт"), ("Author", "Автор"),
+                  ("License", "Лицензия"), ("Requires-Python", "Python"))
+
+_REQUIREMENT_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+_details_cache = {}
+
+def requirement_name(req):
+    m = _REQUIREMENT_NAME_RE.match(req)
+    return canonical_name(m.group(1)) if m else None
+
+def requirement_is_extra(req):
+    marker = req.partition(";")[2]
+    return "extra" in marker
+
+def read_metadata_headers(metadata_path):
+    import email.parser
+    for fname in ("METADATA", "PKG-INFO"):
+        path = os.path.join(metadata_path, fname)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return email.parser.HeaderParser().parse(f)
+    return None
+
+def installed_size(pkg):
+    """Сумма размеров файлов из RECORD (или installed-files.txt у egg-info); None, если неизвестно."""
+    import csv
+    meta = pkg.get("metadata_path")
+    if not meta:
+        return None
+    record = os.path.join(meta, "RECORD")
+    if os.path.isfile(record):
+        base = pkg["location"]
+        total = 0
+        with open(record, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                if len(row) >= 3 and row[2].isdigit():
+                    total += int(row[2])
+                    continue
+                try:
+                    total += os.path.getsize(os.path.join(base, row[0]))
+                except OSError:
+                    pass
+        return total
+    files = os.path.join(meta, "installed-files.txt")
+    if os.path.isfile(files):
+        total = 0
+        with open(files, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    total += os.path.getsize(os.path.join(meta, line.strip()))
+                except OSError:
+                    pass
+        return total
+    return None
+
+def format_size(size):
+    if size is None:
+        return "неизвестно"
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+def package_details(key, python=None):
+    python = python or get_default_python()
+    inventory = get_inventory(python)
+    packages = {p["key"]: p for p in inventory["packages"]}
+    pkg = packages[key]
+    graph = get_dependency_graph(python)
+    required_by = sorted(packages[u]["name"] for u in graph["reverse"].get(key, ()) if u in packages)
+    cache_key = (python_key(python), key, pkg["version"])
+    if cache_key in _details_cache:
+        return dict(_details_cache[cache_key], required_by=required_by)
+    headers = read_metadata_headers(pkg["metadata_path"]) if pkg.get("metadata_path") else None
+    details = {
+        "name": pkg["name"],
+        "version": pkg["version"],
+        "location": pkg["location"],
+        "requires": [r for r in pkg["requires"] if not requirement_is_extra(r)],
+        "extras": [r for r in pkg["requires"] if requirement_is_extra(r)],
+        "size": installed_size(pkg),
+        "fields": [(title, headers.get(field)) for field, title in DETAILS_FIELDS
+                   if headers is not None and headers.get(field) not in (None, "", "UNKNOWN")],
+    }
+    _details_cache[cache_key] = details
+    return dict(details, required_by=required_by)
+
+# ----- Граф зависимостей -----
+# Прямые и обратные рёбра строятся один раз по инвентарю, а при следующих вызовах
+# пересчитываются только пакеты, у которых сменилась версия или которые появились/исчезли.
+
+ORPHAN_KEEP = {"pip", "setuptools", "wheel"}
+
+_dep_graphs = {}
+_dep_graph_lock = threading.Lock()
+
+def _graph_unlink(graph, key):
+    for dep in graph["forward"].pop(key, ()):
+        users = graph["reverse"].get(dep)
+        if users:
+            users.discard(key)
+
+def get_dependency_graph(python=None):
+    """Словарь forward/reverse: ключ пакета → множество ключей (extras не учитываются)."""
+    python = python or get_default_python()
+    inventory = get_inventory(python)
+    with _dep_graph_lock:
+        graph = _dep_graphs.setdefault(python_key(python), {"versions": {}, "forward": {}, "reverse": {}, "packages": {}})
+        current = {p["key"]: p for p in inventory["packages"]}
+        for key in list(graph["versions"]):
+            if key not in current:
+                _graph_unlink(graph, key)
+                del graph["versions"][key]
+        for key, pkg in current.items():
+            if graph["versions"].get(key) == pkg["version"]:
+                continue
+            _graph_unlink(graph, key)
+            deps = {requirement_name(r) for r in pkg["requires"] if not requirement_is_extra(r)}
+            deps.discard(None)
+            deps.discard(key)
+            graph["forward"][key] = deps
+            for dep in deps:
+                graph["reverse"].setdefault(dep, set()).add(key)
+            graph["versions"][key] = pkg["version"]
+        graph["packages"] = current
+        return graph
+
+def installed_dependents(graph, keys):
+    """Установленные пакеты, которые (напрямую или транзитивно) требуют что-то из keys, кроме самих keys."""
+    keys = set(keys)
+    found = set()
+    stack = list(keys)
+    while stack:
+        for user in graph["reverse"].get(stack.pop(), ()):
+            if user in graph["packages"] and user not in keys and user not in found:
+                found.add(user)
+                stack.append(user)
+    return found
+
+def find_orphans(graph):
+    """Пакеты, поставленные pip только как зависимости (нет REQUESTED), которые больше никому не нужны."""
+    orphans = set()
+    changed = True
+    while changed:
+        changed = False
+        for key, pkg in graph["packages"].items():
+            if key in orphans or key in ORPHAN_KEEP or pkg.get("requested", True):
+                continue
+            users = {u for u in graph["reverse"].get(key, ()) if u in graph["packages"]}
+            if users <= orphans:
+                orphans.add(key)
+                changed = True
+    return orphans
+
+# ----- Время импорта -----
+# Для каждого пакета его модули верхнего уровня импортируются в отдельном процессе
+# с -X importtime (дважды: первый прогон прогревает __pycache__). «Своё» время —
+# модули самого пакета, «всего» — вместе с его зависимостями. Результат хранится на
+# диске по интерпретатору и пересчитывается только при смене версии пакета.
+
+IMPORTTIME_CACHE_DIR = os.path.join(CACHE_DIR, "importtime")
+IMPORTTIME_TIMEOUT = 60
+IMPORTTIME_RUNS = 2
+IMPORTTIME_WORKERS = max(1, min(4, os.cpu_count() or 1))
+IMPORTTIME_SCRIPT = (
+    "import sys, json\n"
+    "failed = []\n"
+    "for m in json.loads(sys.argv[1]):\n"
+    "    try:\n"
+    "        __import__(m)\n"
+    "    except BaseException:\n"
+    "        failed.append(m)\n"
+    "print(json.dumps(failed))\n"
+)
+
+_IMPORTTIME_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+_importtime_lock = threading.Lock()
+
+def package_top_modules(pkg):
+    """Имена модулей верхнего уровня: top_level.txt, иначе по RECORD."""
+    import csv
+    meta = pkg.get("metadata_path")
+    if not meta:
+        return [pkg["key"].replace("-", "_")]
+    top = os.path.join(meta, "top_level.txt")
+    if os.path.isfile(top):
+        with open(top, "r", encoding="utf-8", errors="replace") as f:
+            names = [line.strip().replace("/", ".") for line in f if line.strip()]
+        if names:
+            return names
+    names = set()
+    record = os.path.join(meta, "RECORD")
+    if os.path.isfile(record):
+        with open(record, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith(("..", "/")):
+                    continue
+                first = row[0].split("/")[0]
+                if first.endswith((".dist-info", ".data", "__pycache__")):
+                    continue
+                if "/" in row[0] or first.endswith((".py", ".so", ".pyd")):
+                    names.add(first.split(".")[0])
+    return sorted(n for n in names if n.isidentifier()) or [pkg["key"].replace("-", "_")]
+
+def parse_importtime(stderr, modules):
+    """(своё время, всего) в миллисекундах по выводу -X importtime."""
+    own = total = 0
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+        top = name.split(".")[0]
+        if top in modules:
+            own += self_us
+            if indent == 1 and name in modules:
+                total += cumulative_us
+    return own / 1000, total / 1000
+
+def measure_import_time(python, pkg):
+    modules = package_top_modules(pkg)
+    best = None
+    for _ in range(IMPORTTIME_RUNS):
+        proc = subprocess.run([python, "-X", "importtime", "-c", IMPORTTIME_SCRIPT, json.dumps(modules)],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                              text=True, timeout=IMPORTTIME_TIMEOUT, cwd=tempfile.gettempdir())
+        try:
+            failed = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            failed = modules
+        own, total = parse_importtime(proc.stderr, set(modules))
+        if best is None or total < best["total_ms"]:
+            best = {"version": pkg["version"], "modules": modules, "failed": failed,
+                    "self_ms": round(own, 1), "total_ms": round(total, 1)}
+    return best
+
+def _importtime_cache_path(python):
+    digest = hashlib.sha256(python_key(python).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(IMPORTTIME_CACHE_DIR, digest + ".json")
+
+def load_import_times(python=None):
+    """{ключ пакета: замер} для актуальных версий пакетов."""
+    python = python or get_default_python()
+    try:
+        with open(_importtime_cache_path(python), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    versions = {p["key"]: p["version"] for p in get_inventory(python)["packages"]}
+    return {k: v for k, v in cached.items() if versions.get(k) == v["version"]}
+
+def profile_imports(keys, python=None, on_result=None, force=False):
+    """Замеряет пакеты keys в пуле процессов; уже замеренные (та же версия) берутся из кэша."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    python = python or get_default_python()
+    packages = {p["key"]: p for p in get_inventory(python)["packages"]}
+    results = load_import_times(python)
+    todo = [packages[k] for k in keys if k in packages and (force or k not in results)]
+    for k in keys:
+        if k in results and not force and on_result:
+            on_result(k, results[k])
+    def save():
+        with _importtime_lock:
+            try:
+                write_file_atomic(_importtime_cache_path(python), json.dumps(results))
+            except OSError:
+                pass
+    with ThreadPoolExecutor(max_workers=IMPORTTIME_WORKERS) as pool:
+        futures = {pool.submit(measure_import_time, python, pkg): pkg for pkg in todo}
+        for fut in as_completed(futures):
+            pkg = futures[fut]
+            try:
+                results[pkg["key"]] = fut.result()
+            except Exception as e:
+                results[pkg["key"]] = {"version": pkg["version"], "modules": [], "failed": [str(e)],
+                                       "self_ms": None, "total_ms": None}
+            if on_result:
+                on_result(pkg["key"], results[pkg["key"]])
+    if todo:
+        save()
+    return results
+
+# ===== PyPI: метаданные индекса =====
+# Версии проектов берутся из JSON-формата simple API (PEP 691/700) и кэшируются на
+# диске вместе с ETag. В пределах PYPI_CACHE_TTL ответ отдаётся без сети, позже —
+# условным запросом, так что проверка «что устарело» почти ничего не скачивает.
+# Индекс тот же, что у pip: PIP_INDEX_URL или index-url из pip config, иначе pypi.org.
+# Запросы идут через свою сессию, отдельную от клиента GitHub.
+
+PYPI_SIMPLE_URL = "https://pypi.org/simple/"
+PIP_CONFIG_TIMEOUT = 15
+PYPI_SIMPLE_ACCEPT = "application/vnd.pypi.simple.v1+json, text/html;q=0.1"
+PYPI_CACHE_DIR = os.path.join(CACHE_DIR, "pypi")
+PYPI_CACHE_TTL = 60 * 60
+PYPI_MAX_WORKERS = 8
+
+_STABLE_VERSION_RE = re.compile(r"^\d+(\.\d+)*(\.post\d+)?$")
+
+# Разбор версий по PEP 440 на случай, если packaging не установлен
+_PEP440_RE = re.compile(r"""
+    v?(?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)[-_.]?(?P<pre_n>\d+)?)?
+    (?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+""", re.VERBOSE | re.IGNORECASE)
+_PRE_PHASES = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+
+def _pep440_key(version):
+    m = _PEP440_RE.fullmatch(version.strip())
+    if not m:
+        return None
+    release = [int(p) for p in m.group("release").split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()  # 1.0 и 1.0.0 — одна и та же версия
+    has_post = m.group("post_n1") is not None or m.group("post_l") is not None
+    has_dev = m.group("dev_l") is not None
+    if m.group("pre_l"):
+        pre = (_PRE_PHASES[m.group("pre_l").lower()], int(m.group("pre_n") or 0))
+    elif has_dev and not has_post:
+        pre = (-1, 0)  # 1.0.dev1 раньше 1.0a1
+    else:
+        pre = (3, 0)   # финальный релиз позже любого rc
+    post = int(m.group("post_n1") or m.group("post_n2") or 0) if has_post else -1
+    dev = int(m.group("dev_n") or 0) if has_dev else float("inf")
+    local = tuple((1, int(p), "") if p.isdigit() else (0, 0, p.lower())
+                  for p in re.split(r"[-_.]", m.group("local"))) if m.group("local") else ()
+    return (int(m.group("epoch") or 0), tuple(release), pre, post, dev, local)
+
+def version_sort_key(version):
+    """Ключ сортировки версий по PEP 440; невалидные версии идут раньше валидных."""
+    version = str(version)
+    key = None
+    if HAS_PACKAGING:
+        try:
+            key = lazy_import("packaging.version").Version(version)
+        except ValueError:
+            pass
+    else:
+        key = _pep440_key(version)
+    if key is None:
+        return (0, [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"[.\-+]", version)])
+    return (1, key)
+
+def is_stable_version(version):
+    return bool(_STABLE_VERSION_RE.match(version))
+
+_SIMPLE_LINK_RE = re.compile(r"<a\s[^>]*>([^<]+)</a>", re.I)
+_SDIST_EXTENSIONS = (".tar.gz", ".zip", ".tar.bz2", ".tgz")
+
+_HREF_HASH_RE = re.compile(r'href="[^"#]*#sha256=([0-9a-f]{64})"', re.I)
+
+def filename_version(name, filename):
+    """Версия из имени файла дистрибутива (колесо или sdist) или None."""
+    prefix = canonical_name(name).replace("-", "_")
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+    for ext in _SDIST_EXTENSIONS:
+        if filename.endswith(ext):
+            stem, _, version = filename[:-len(ext)].rpartition("-")
+            if canonical_name(stem).replace("-", "_") == prefix and version:
+                return version
+            return None
+    return None
+
+def parse_simple_html(name, html):
+    """Зеркала вроде devpi отдают только HTML — версии достаём из имён файлов, хэши из ссылок."""
+    versions = set()
+    files = []
+    for m in _SIMPLE_LINK_RE.finditer(html):
+        if "data-yanked" in m.group(0):
+            continue
+        filename = m.group(1).strip()
+        version = filename_version(name, filename)
+        if version:
+            versions.add(version)
+            h = _HREF_HASH_RE.search(m.group(0))
+            files.append({"filename": filename, "hashes": {"sha256": h.group(1)} if h else {}})
+    return {"name": name, "versions": sorted(versions, key=version_sort_key), "files": files}
+
+_pypi_session = [None]
+_pypi_index_urls = {}
+_pypi_lock = threading.Lock()
+_pypi_index_lock = threading.Lock()
+
+def get_pypi_session():
+    with _pypi_lock:
+        if _pypi_session[0] is None:
+            requests = get_requests()
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=PYPI_MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": "PythonToolPack"})
+            _pypi_session[0] = session
+        return _pypi_session[0]
+
+def _pip_config_index_url(python):
+    try:
+        result = subprocess.run([python, "-m", "pip", "config", "list"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=PIP_CONFIG_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    values = {}
+    for line in result.stdout.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip()] = value.strip().strip("'\"")
+    return values.get("install.index-url") or values.get("global.index-url")
+
+def pypi_simple_url(python=None):
+    """Адрес simple API, которым пользуется pip выбранного интерпретатора, с / на конце."""
+    url = os.environ.get("PIP_INDEX_URL")
+    if not url:
+        python = python or get_default_python()
+        key = python_key(python)
+        with _pypi_index_lock:
+            url = _pypi_index_urls.get(key)
+            if url is None:
+                url = _pip_config_index_url(python) or PYPI_SIMPLE_URL
+                _pypi_index_urls[key] = url
+    return url.rstrip("/") + "/"
+
+def _pypi_cache_path(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(PYPI_CACHE_DIR, key[:2], key + ".json")
+
+def pypi_get(url, ttl=PYPI_CACHE_TTL):
+    """JSON ответа simple API или None, если проекта нет в индексе."""
+    requests = get_requests()
+    path = _pypi_cache_path(url)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        entry = None
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        return entry["data"]
+    headers = {"Accept": PYPI_SIMPLE_ACCEPT}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    try:
+        resp = get_pypi_session().get(url, headers=headers, timeout=15)
+    except requests.RequestException:
+        if entry:
+            return entry["data"]
+        raise
+    if resp.status_code == 304 and entry:
+        data = entry["data"]
+    elif resp.status_code == 404:
+        data = None
+    else:
+        resp.raise_for_status()
+        if "json" in resp.headers.get("Content-Type", ""):
+            data = resp.json()
+        else:
+            data = parse_simple_html(url.rstrip("/").rsplit("/", 1)[-1], resp.text)
+    try:
+        write_file_atomic(path, json.dumps({
+            "fetched_at": time.time(),
+            "etag": resp.headers.get("ETag") if resp.status_code != 304 else entry.get("etag"),
+            "data": data,
+        }))
+    except OSError:
+        pass
+    return data
+
+def pypi_versions(name):
+    data = pypi_get(f"{pypi_simple_url()}{canonical_name(name)}/")
+    return data.get("versions", []) if data else []
+
+def latest_stable_version(versions):
+    stable = [v for v in versions if is_stable_version(v)]
+    return max(stable, key=version_sort_key) if stable else None
+
+def find_outdated(packages, progress=None):
+    """Список (пакет, последняя версия) только для тех, у кого в индексе есть версия новее."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    def check(pkg):
+        latest = latest_stable_version(pypi_versions(pkg["name"]))
+        if latest and version_sort_key(latest) > version_sort_key(pkg["version"]):
+            return pkg, latest
+        return None
+    outdated = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=PYPI_MAX_WORKERS) as pool:
+        futures = [pool.submit(check, pkg) for pkg in packages]
+        for fut in as_completed(futures):
+            done += 1
+            try:
+                found = fut.result()
+            except Exception:
+                found = None
+            if found:
+                outdated.append(found)
+            if progress:
+                progress(done, len(futures))
+    outdated.sort(key=lambda item: item[0]["name"].lower())
+    return outdated
+
+# ----- Локальный индекс имён PyPI -----
+# Все имена проектов (нормализованные, отсортированные, по одному на строку) лежат
+# одной строкой в памяти и в names.txt: поиск по префиксу — str.find, по подстроке и
+# с опечатками — регулярное выражение и difflib в фоне. Полный список скачивается
+# условным запросом раз в неделю, в промежутке раз в сутки подмешиваются новые
+# проекты из RSS. Можно указать свой файл (config["pypi_names_file"]) — тогда сеть не нужна.
+
+PYPI_NAMES_FILE = os.path.join(PYPI_CACHE_DIR, "names.txt")
+PYPI_NAMES_META = os.path.join(PYPI_CACHE_DIR, "names.json")
+PYPI_NAMES_MIRROR_KEY = "pypi_names_file"
+PYPI_NAMES_TTL = 24 * 60 * 60
+PYPI_NAMES_FULL_TTL = 7 * 24 * 60 * 60
+PYPI_NEWEST_FEED = "https://pypi.org/rss/packages.xml"
+PYPI_SUGGEST_LIMIT = 15
+PYPI_SUGGEST_SCAN = 300
+
+_SIMPLE_PROJECT_RE = re.compile(r'href="[^"]*?([^"/]+)/"')
+_FEED_PROJECT_RE = re.compile(r"/project/([^/<\s]+)/")
+
+pypi_names = {"blob": "\n", "count": 0, "source": None}
+_pypi_names_lock = threading.Lock()
+
+def _set_pypi_names(names, source):
+    names = sorted({canonical_name(n) for n in names if n})
+    with _pypi_names_lock:
+        pypi_names.update(blob="\n" + "\n".join(names) + "\n", count=len(names), source=source)
+    return names
+
+def _read_names_file(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if text.lstrip().startswith(("{", "[")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = [p["name"] for p in data.get("projects", [])]
+        return data
+    if "<a " in text:
+        return _SIMPLE_PROJECT_RE.findall(text)
+    return text.split()
+
+def _load_names_meta():
+    try:
+        with open(PYPI_NAMES_META, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_names(names, meta):
+    try:
+        write_file_atomic(PYPI_NAMES_FILE, "\n".join(names) + "\n")
+        write_file_atomic(PYPI_NAMES_META, json.dumps(meta))
+    except OSError:
+        pass
+
+def download_pypi_names(index_url, etag=None):
+    """(имена, etag) или (None, etag), если список не изменился. Ответ читается потоком."""
+    headers = {"Accept": PYPI_SIMPLE_ACCEPT}
+    if etag:
+        headers["If-None-Match"] = etag
+    resp = get_pypi_session().get(index_url, headers=headers, timeout=60, stream=True)
+    try:
+        if resp.status_code == 304:
+            return None, etag
+        resp.raise_for_status()
+        if "json" in resp.headers.get("Content-Type", ""):
+            names = [p["name"] for p in resp.json().get("projects", [])]
+        else:
+            names = []
+            for line in resp.iter_lines(decode_unicode=True):
+                names.extend(_SIMPLE_PROJECT_RE.findall(line or ""))
+        return names, resp.headers.get("ETag")
+    finally:
+        resp.close()
+
+def fetch_newest_pypi_names(index_url):
+    if index_url != PYPI_SIMPLE_URL:
+        return []  # RSS новых проектов есть только у pypi.org; зеркало обновляется полной загрузкой
+    resp = get_pypi_session().get(PYPI_NEWEST_FEED, timeout=15)
+    if resp.status_code != 200:
+        return []
+    return _FEED_PROJECT_RE.findall(resp.text)
+
+def load_pypi_names(refresh=True):
+    """Загружает индекс имён в память; при refresh обновляет его из сети, если устарел."""
+    mirror = config.get(PYPI_NAMES_MIRROR_KEY)
+    if mirror and os.path.isfile(mirror):
+        _set_pypi_names(_read_names_file(mirror), mirror)
+        return
+    names = None
+    if pypi_names["source"] is None and os.path.isfile(PYPI_NAMES_FILE):
+        # Свой файл уже нормализован и отсортирован — читаем как есть
+        with open(PYPI_NAMES_FILE, "r", encoding="utf-8") as f:
+            text = f.read()
+        with _pypi_names_lock:
+            pypi_names.update(blob="\n" + text, count=text.count("\n"), source=PYPI_NAMES_FILE)
+    if not refresh or not HAS_REQUESTS:
+        return
+    meta = _load_names_meta()
+    now = time.time()
+    try:
+        index_url = pypi_simple_url()
+        same_index = meta.get("index", PYPI_SIMPLE_URL) == index_url
+        if not pypi_names["count"] or not same_index or now - meta.get("full_at", 0) > PYPI_NAMES_FULL_TTL:
+            fresh, etag = download_pypi_names(index_url,
+                                              meta.get("etag") if pypi_names["count"] and same_index else None)
+            if fresh is not None:
+                names = _set_pypi_names(fresh, index_url)
+            meta.update(full_at=now, checked_at=now, etag=etag, index=index_url)
+        elif now - meta.get("checked_at", 0) > PYPI_NAMES_TTL:
+            newest = [n for n in fetch_newest_pypi_names(index_url) if not pypi_name_exists(n)]
+            if newest:
+                names = _set_pypi_names(pypi_names["blob"].split() + newest, index_url)
+            meta["checked_at"] = now
+        else:
+            return
+    except Exception:
+        return
+    if names is None:
+        names = pypi_names["blob"].split()
+    _save_names(names, meta)
+
+def pypi_name_exists(name):
+    return pypi_names["blob"].find(f"\n{canonical_name(name)}\n") != -1
+
+def suggest_packages(text, limit=PYPI_SUGGEST_LIMIT):
+    """Сначала совпадения по префиксу (короткие имена выше), потом по подстроке."""
+    text = canonical_name(text.strip())
+    if not text:
+        return []
+    blob = pypi_names["blob"]
+    prefixed = []
+    pos = blob.find("\n" + text)
+    while pos != -1 and len(prefixed) < PYPI_SUGGEST_SCAN:
+        end = blob.find("\n", pos + 1)
+        if end == -1 or not blob.startswith(text, pos + 1):
+            break
+        prefixed.append(blob[pos + 1:end])
+        pos = end
+    found = sorted(prefixed, key=lambda n: (len(n), n))[:limit]
+    pos = 0
+    while len(found) < limit and len(text) >= 2:
+        pos = blob.find(text, pos)
+        if pos == -1:
+            break
+        start = blob.rfind("\n", 0, pos) + 1
+        end = blob.find("\n", pos)
+        name = blob[start:end]
+        if name not in found:
+            found.append(name)
+        pos = end
+    return found
+
+def fuzzy_packages(text, limit=5):
+    """Похожие имена для опечаток: кандидаты с той же первой буквой и близкой длиной."""
+    import difflib
+    text = canonical_name(text.strip())
+    if len(text) < 3:
+        return []
+    pattern = re.compile(r"^%s[^\n]{%d,%d}$" % (re.escape(text[0]), max(len(text) - 3, 0), len(text) + 1), re.M)
+    candidates = pattern.findall(pypi_names["blob"])
+    return difflib.get_close_matches(text, candidates, n=limit, cutoff=0.75)
+
+# ===== Локальный склад колёс (wheelhouse) =====
+# Склад включается в настройках. pip install по-прежнему разрешает версии по индексу,
+# но с --find-links на склад, так что совпавшие колёса не скачиваются заново; после
+# установки на склад докладываются (pip wheel --no-deps) только реально поставленные
+# версии, которых там ещё нет. В режиме «Только склад» ставится с --no-index — для
+# машин без сети. mtime файла — время последнего использования, по нему вытесняются
+# самые старые колёса.
+
+WHEELHOUSE_DIR = os.path.join(CACHE_DIR, "wheelhouse")
+WHEELHOUSE_USE_KEY = "use_wheelhouse"
+WHEELHOUSE_OFFLINE_KEY = "wheelhouse_offline"
+WHEELHOUSE_LIMIT_KEY = "wheelhouse_max_mb"
+WHEELHOUSE_DEFAULT_LIMIT_MB = 2048
+WHEELHOUSE_EXTENSIONS = (".whl", ".tar.gz", ".zip")
+
+_wheelhouse_lock = threading.Lock()
+
+def wheelhouse_dir():
+    folder = os.path.abspath(config.get("wheelhouse_dir") or WHEELHOUSE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def wheelhouse_files():
+    folder = wheelhouse_dir()
+    files = []
+    for name in os.listdir(folder):
+        if name.endswith(WHEELHOUSE_EXTENSIONS):
+            try:
+                st = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            files.append((name, st.st_size, st.st_mtime))
+    return files
+
+def wheelhouse_size():
+    files = wheelhouse_files()
+    return sum(size for _, size, _ in files), len(files)
+
+def wheelhouse_has(name, version):
+    key = canonical_name(name)
+    for fname, _, _ in wheelhouse_files():
+        if fname.endswith(".whl"):
+            parts = fname.split("-")
+            if len(parts) >= 5 and canonical_name(parts[0]) == key and parts[1] == version:
+                return True
+        elif filename_version(name, fname) == version:
+            return True
+    return False
+
+def wheelhouse_touch(output):
+    # pip называет взятые со склада файлы («Processing …», «Saved …»), иногда относительным путём
+    folder = wheelhouse_dir()
+    now = time.time()
+    for name in set(re.findall(r"([^\s/\\'\"]+\.(?:whl|tar\.gz|zip))\b", output)):
+        if not os.path.isfile(os.path.join(folder, name)):
+            continue
+        try:
+            os.utime(os.path.join(folder, name), (now, now))
+        except OSError:
+            pass
+
+def wheelhouse_evict(limit_bytes=None):
+    """Удаляет давно не использованные файлы, пока склад не станет меньше лимита. Возвращает число удалённых."""
+    if limit_bytes is None:
+        limit_bytes = int(config.get(WHEELHOUSE_LIMIT_KEY, WHEELHOUSE_DEFAULT_LIMIT_MB)) * 1024 * 1024
+    with _wheelhouse_lock:
+        files = sorted(wheelhouse_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for name, size, _ in files:
+            if total <= limit_bytes:
+                break
+            try:
+                os.remove(os.path.join(wheelhouse_dir(), name))
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+def run_pip(python, args, on_line=None):
+    """Запускает pip и построчно отдаёт вывод в on_line; возвращает (код, весь вывод)."""
+    proc = subprocess.Popen([python, '-m', 'pip'] + args, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, bufsize=1)
+    lines = []
+    for line in proc.stdout:
+        lines.append(line)
+        if on_line:
+            on_line(line)
+    proc.wait()
+    return proc.returncode, "".join(lines)
+
+_PIP_INSTALLED_RE = re.compile(r"^Successfully installed (.+)$", re.M)
+
+def pip_installed_versions(output):
+    """[(имя, версия)] из строки pip «Successfully installed a-1.0 b-2.0»."""
+    found = []
+    for m in _PIP_INSTALLED_RE.finditer(output):
+        for item in m.group(1).split():
+            name, _, version = item.rpartition("-")
+            if name and version:
+                found.append((name, version))
+    return found
+
+def pip_install(python, args, on_line=None):
+    """pip install args, со складом колёс, если он включён; возвращает (код, вывод)."""
+    if config.get(WHEELHOUSE_OFFLINE_KEY):
+        code, output = run_pip(python, ['install', '--no-index', '--find-links', wheelhouse_dir()] + args, on_line)
+        wheelhouse_touch(output)
+        return code, output
+    if not config.get(WHEELHOUSE_USE_KEY, False):
+        return run_pip(python, ['install'] + args, on_line)
+    folder = wheelhouse_dir()
+    code, output = run_pip(python, ['install', '--find-links', folder] + args, on_line)
+    wheelhouse_touch(output)
+    # Массовое обновление — ровно один вызов pip, склад при нём не пополняется
+    upgrade = "--upgrade" in args or "-U" in args
+    if code == 0 and not upgrade:
+        missing = [f"{n}=={v}" for n, v in pip_installed_versions(output) if not wheelhouse_has(n, v)]
+        if missing:
+            # Только то, что реально поставили, без повторного разрешения зависимостей
+            run_pip(python, ['wheel', '--no-deps', '--wheel-dir', folder, '--find-links', folder] + missing, on_line)
+        wheelhouse_evict()
+    return code, output
+
+# ===== Снимок окружения (lock-файл) =====
+# Экспорт — обычный requirements.txt с точными версиями и --hash (pip install
+# --require-hashes понимает его и без нас). Восстановление сравнивает файл с
+# инвентарём, заранее параллельно скачивает на склад только недостающее и ставит
+# всё одним вызовом pip.
+
+LOCK_DOWNLOAD_WORKERS = max(2, min(8, (os.cpu_count() or 2) * 2))
+_LOCK_LINE_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)==([^\s;\\]+)")
+_LOCK_HASH_RE = re.compile(r"--hash=sha256:([0-9a-f]{64})", re.I)
+
+def pypi_release_hashes(name, version, python=None):
+    url = f"{pypi_simple_url(python)}{canonical_name(name)}/"
+    data = pypi_get(url)
+    if data is not None and "files" not in data:
+        data = pypi_get(url, ttl=0)
+    if not data:
+        return []
+    return sorted({f["hashes"]["sha256"] for f in data.get("files", [])
+                   if f.get("hashes", {}).get("sha256") and filename_version(name, f["filename"]) == version})
+
+def export_lock(path, python=None, progress=None):
+    """Пишет lock-файл; возвращает (сколько записано, имена без хэшей в индексе)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    inventory = get_inventory(python)
+    packages = inventory["packages"]
+    results = {}
+    done = 0
+    with ThreadPoolExecutor(max_workers=PYPI_MAX_WORKERS) as pool:
+        futures = {pool.submit(pypi_release_hashes, p["name"], p["version"], python): p for p in packages}
+        for fut in as_completed(futures):
+            pkg = futures[fut]
+            try:
+                results[pkg["key"]] = fut.result()
+            except Exception:
+                results[pkg["key"]] = []
+            done += 1
+            if progress:
+                progress(done, len(futures))
+    lines = [f"# Снимок окружения PythonToolPack: Python {inventory['version']}, {time.strftime('%Y-%m-%d %H:%M')}",
+             "# Установка без программы: pip install --require-hashes --no-deps -r <этот файл>", ""]
+    missing = []
+    for pkg in packages:
+        hashes = results.get(pkg["key"])
+        if not hashes:
+            missing.append(pkg["name"])
+            lines.append(f"# {pkg['name']}=={pkg['version']}  (нет в индексе — пропущен)")
+            continue
+        lines.append(f"{pkg['name']}=={pkg['version']} \\")
+        lines.append(" \\\n".join(f"    --hash=sha256:{h}" for h in hashes))
+    write_file_atomic(path, "\n".join(lines) + "\n")
+    return len(packages) - len(missing), missing
+
+def parse_lock(path):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().replace("\\\n", " ")
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        m = _LOCK_LINE_RE.match(line)
+        if m:
+            entries.append({"name": m.group(1), "key": canonical_name(m.group(1)), "version": m.group(2),
+                            "hashes": _LOCK_HASH_RE.findall(line)})
+    return entries
+
+def diff_lock(entries, inventory):
+    """(что поставить, что уже совпадает, что есть только в окружении)."""
+    installed = {p["key"]: p for p in inventory["packages"]}
+    wanted = {e["key"] for e in entries}
+    install = [e for e in entries if installed.get(e["key"], {}).get("version") != e["version"]]
+    same = [e for e in entries if installed.get(e["key"], {}).get("version") == e["version"]]
+    extra = [p for k, p in installed.items() if k not in wanted]
+    return install, same, extra
+
+def lock_requirements(entries):
+    lines = []
+    for e in entries:
+        lines.append(f"{e['name']}=={e['version']}" + "".join(f" --hash=sha256:{h}" for h in e["hashes"]))
+    return "\n".join(lines) + "\n"
+
+def prefetch_lock(python, entries, progress=None):
+    """Параллельно кладёт нужные файлы на склад; возвращает (время, сумма времён по отдельности, ошибки)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    folder = wheelhouse_dir()
+    started = time.perf_counter()
+    serial = [0.0]
+    failed = []
+    def fetch(entry):
+        t = time.perf_counter()
+        code, out = run_pip(python, ['download', '--no-deps', '--dest', folder, '--find-links', folder,
+                                     f"{entry['name']}=={entry['version']}"])
+        wheelhouse_touch(out)
+        return code, time.perf_counter() - t
+    done = 0
+    with ThreadPoolExecutor(max_workers=LOCK_DOWNLOAD_WORKERS) as pool:
+        futures = {pool.submit(fetch, e): e for e in entries}
+        for fut in as_completed(futures):
+            try:
+                code, elapsed = fut.result()
+            except Exception:
+                code, elapsed = 1, 0.0
+            serial[0] += elapsed
+            if code != 0:
+                failed.append(futures[fut]["name"])
+            done += 1
+            if progress:
+                progress(done, len(futures))
+    return time.perf_counter() - started, serial[0], failed
+
+def restore_lock(python, entries, on_line=None):
+    """Ставит entries одним вызовом pip: сначала со склада, при неудаче — из индекса."""
+    fd, req = tempfile.mkstemp(suffix=".txt", prefix="pythontoolpack_lock_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(lock_requirements(entries))
+        hashed = all(e["hashes"] for e in entries)
+        args = ['install', '--no-deps', '-r', req] + (['--require-hashes'] if hashed else [])
+        code, out = run_pip(python, args[:1] + ['--no-index', '--find-links', wheelhouse_dir()] + args[1:], on_line)
+        if code != 0 and not config.get(WHEELHOUSE_OFFLINE_KEY):
+            # Например, на складе колесо, собранное из sdist: его хэш не совпадёт с индексом
+            code, more = run_pip(python, args, on_line)
+            out += more
+        wheelhouse_touch(out)
+        return code, out
+    finally:
+        try:
+            os.remove(req)
+        except OSError:
+            pass
+
+# ===== Сборка exe (PyInstaller) =====
+# Каждая цель собирается в своих папках <out>/.build/<имя>/ (work и spec), поэтому
+# несколько PyInstaller можно запускать одновременно. Число параллельных сборок —
+# по ядрам и свободной памяти: одна сборка легко съедает полгигабайта.
+
+BUILD_DIR_NAME = ".build"
+BUILD_MEMORY_PER_JOB = 700 * 1024 * 1024
+BUILD_MAX_JOBS = 8
+EXE_SUFFIX = ".exe" if os.name == "nt" else ""
+
+def available_memory():
+    """Свободная физическая память в байтах или None, если узнать не удалось."""
+    if os.name == "nt":
+        import ctypes
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        stat = MEMORYSTATUSEX()
+        stat.dwLength = ctypes.sizeof(stat)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)):
+            return stat.ullAvailPhys
+        return None
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def build_parallelism(targets):
+    jobs = max(1, min(BUILD_MAX_JOBS, os.cpu_count() or 1, targets))
+    memory = available_memory()
+    if memory is not None:
+        jobs = max(1, min(jobs, memory // BUILD_MEMORY_PER_JOB))
+    return jobs
+
+def build_targets(scripts):
+    """Цели сборки с уникальными именами: два main.py из разных папок станут main и main_2."""
+    targets, used = [], set()
+    for script in scripts:
+        base = os.path.splitext(os.path.basename(script))[0]
+        name, n = base, 1
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.lower())
+        targets.append({"script": os.path.abspath(script), "name": name})
+    return targets
+
+def build_artifact(out_dir, name, onefile):
+    if onefile:
+        return os.path.join(out_dir, name + EXE_SUFFIX)
+    return os.path.join(out_dir, name, name + EXE_SUFFIX)
+
+def clear_artifact_conflict(out_dir, name, onefile):
+    """Без суффикса .exe onefile <out>/name и папка onedir <out>/name/ — один путь: убираем другой вариант."""
+    if EXE_SUFFIX:
+        return
+    path = os.path.join(out_dir, name)
+    if onefile and os.path.isdir(path) and os.path.isfile(os.path.join(path, name)):
+        shutil.rmtree(path)
+    elif not onefile and os.path.isfile(path):
+        os.remove(path)
+
+def pyinstaller_command(python, target, out_dir, onefile, icon=None, extra=()):
+    work_root = os.path.join(out_dir, BUILD_DIR_NAME, target["name"])
+    cmd = [python, "-m", "PyInstaller", "--noconfirm",
+           "--name", target["name"],
+           "--distpath", out_dir,
+           "--workpath", os.path.join(work_root, "work"),
+           "--specpath", work_root]
+    if onefile:
+        cmd.append("--onefile")
+    if icon:
+        cmd += ["--icon", icon]
+    for module in target.get("excludes", ()):
+        cmd += ["--exclude-module", module]
+    if target.get("startup_hook"):
+        cmd += ["--runtime-hook", startup_hook_path()]
+    cmd += list(extra)
+    cmd.append(target["script"])
+    return cmd
+
+def run_build(python, target, out_dir, onefile, icon=None, extra=()):
+    """Одна сборка PyInstaller; возвращает словарь с ok, elapsed, artifact, log."""
+    started = time.perf_counter()
+    try:
+        clear_artifact_conflict(out_dir, target["name"], onefile)
+        result = subprocess.run(pyinstaller_command(python, target, out_dir, onefile, icon, extra),
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                cwd=os.path.dirname(target["script"]))
+        ok, log = result.returncode == 0, result.stdout
+    except Exception as e:
+        ok, log = False, f"Ошибка: {e}"
+    return {"ok": ok, "elapsed": time.perf_counter() - started,
+            "artifact": build_artifact(out_dir, target["name"], onefile), "log": log}
+
+# ----- Кэш сборок -----
+# Ключ зависимостей — интерпретатор, версии пакетов, опции и содержимое локальных
+# модулей, которые скрипт импортирует (транзитивно). Полный ключ — он же плюс сам
+# скрипт. Совпал полный ключ и файл на месте — сборка пропускается. Сменился только
+# скрипт — PyInstaller запускается без --clean и переиспользует свой кэш анализа;
+# сменились зависимости — с --clean.
+
+BUILD_STATE_FILE = "state.json"
+BUILD_STATE_KEEP = 4
+
+def _module_file(base, parts):
+    path = os.path.join(base, *parts)
+    for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def script_local_modules(script):
+    """Локальные .py, которые скрипт импортирует напрямую или через другие локальные модули."""
+    import ast
+    script = os.path.abspath(script)
+    base = os.path.dirname(script)
+    found, stack = set(), [script]
+    while stack:
+        path = stack.pop()
+        try:
+            with open(path, "rb") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names += [a.name.split(".") for a in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    pkg_dir = os.path.dirname(path)
+                    for _ in range(node.level - 1):
+                        pkg_dir = os.path.dirname(pkg_dir)
+                    rel = os.path.relpath(pkg_dir, base).split(os.sep) if pkg_dir != base else []
+                    if rel and rel[0] == "..":
+                        continue
+                    prefix = rel + (node.module.split(".") if node.module else [])
+                else:
+                    prefix = node.module.split(".")
+                names.append(prefix)
+                names += [prefix + [a.name] for a in node.names if a.name != "*"]
+        for parts in names:
+            # Пакет a.b.c тянет за собой a/__init__.py и a/b/__init__.py
+            for i in range(1, len(parts) + 1):
+                module = _module_file(base, parts[:i])
+                if module and module != script and module not in found:
+                    found.add(module)
+                    stack.append(module)
+    return sorted(found)
+
+def _hash_file(h, path):
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b""):
+                h.update(chunk)
+    except OSError:
+        h.update(b"<missing>")
+
+def build_keys(python, target, onefile, icon=None, extra=()):
+    """(полный ключ, ключ зависимостей) цели сборки."""
+    inventory = get_inventory(python)
+    h = hashlib.sha256()
+    h.update(json.dumps([python_key(python), inventory["version"],
+                         [[p["key"], p["version"]] for p in inventory["packages"]],
+                         bool(onefile), list(extra), icon or "", sorted(target.get("excludes", ())),
+                         STARTUP_HOOK_SOURCE if target.get("startup_hook") else ""]).encode("utf-8"))
+    if icon:
+        _hash_file(h, icon)
+    for module in script_local_modules(target["script"]):
+        h.update(os.path.relpath(module, os.path.dirname(target["script"])).encode("utf-8"))
+        _hash_file(h, module)
+    dep_key = h.hexdigest()
+    _hash_file(h, target["script"])
+    return h.hexdigest(), dep_key
+
+def _build_state_path(out_dir, name):
+    return os.path.join(out_dir, BUILD_DIR_NAME, name, BUILD_STATE_FILE)
+
+def load_build_state(out_dir, name):
+    try:
+        with open(_build_state_path(out_dir, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"dep_key": None, "artifacts": {}}
 
-# PyInstaller hack: скрыть консольное окно в exe
-if hasattr(sys, 'frozen'):
+def save_build_state(out_dir, name, state):
     try:
-        import ctypes
-        ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
-    except Exception:
+        write_file_atomic(_build_state_path(out_dir, name), json.dumps(state, indent=1))
+    except OSError:
         pass
 
-# ==== Проверка наличия requests ====
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
+def artifact_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
 
-# ==== Проверка наличия jedi ====
-try:
-    import jedi
-    HAS_JEDI = True
-except ImportError:
-    HAS_JEDI = False
+def cached_artifact(state, full_key):
+    entry = state["artifacts"].get(full_key)
+    if entry and os.path.isfile(entry["path"]) and artifact_stamp(entry["path"]) == entry["stamp"]:
+        return entry["path"]
+    return None
 
-try:
-    from PyQt5.QtWidgets import QCheckBox, QToolBar
-    HAS_PYQT5 = True
-except ImportError:
-    HAS_PYQT5 = False
+def remember_artifact(state, full_key, dep_key, path):
+    state["dep_key"] = dep_key
+    state["artifacts"][full_key] = {"path": path, "stamp": artifact_stamp(path), "time": time.time()}
+    # Помним несколько последних вариантов (например, onefile и onedir), старые забываем
+    newest = sorted(state["artifacts"].items(), key=lambda kv: kv[1]["time"], reverse=True)[:BUILD_STATE_KEEP]
+    state["artifacts"] = dict(newest)
 
-CONFIG_FILE = "config.json"
+def build_target(python, target, out_dir, onefile, icon=None, force=False):
+    """Сборка с учётом кэша; в результате есть cached (пропущена) и clean (была с --clean)."""
+    try:
+        full_key, dep_key = build_keys(python, target, onefile, icon)
+    except Exception:
+        full_key = dep_key = None
+    state = load_build_state(out_dir, target["name"])
+    cached = cached_artifact(state, full_key) if full_key and not force else None
+    if cached:
+        return {"ok": True, "cached": True, "clean": False, "elapsed": 0.0, "artifact": cached,
+                "log": "Скрипт, его локальные модули, пакеты и опции не менялись — сборка пропущена."}
+    clean = force or dep_key is None or state["dep_key"] != dep_key
+    res = run_build(python, target, out_dir, onefile, icon, ["--clean"] if clean else [])
+    res.update(cached=False, clean=clean)
+    if res["ok"] and full_key:
+        remember_artifact(state, full_key, dep_key, res["artifact"])
+        save_build_state(out_dir, target["name"], state)
+    return res
 
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+def run_builds(python, targets, out_dir, onefile, icon=None, on_event=None, jobs=None, force=False):
+    """Собирает цели параллельно. on_event(имя, "start"|"done", результат или None)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    jobs = jobs or build_parallelism(len(targets))
+    results = {}
+    def build(target):
+        if on_event:
+            on_event(target["name"], "start", None)
+        res = build_target(python, target, out_dir, onefile, icon, force)
+        if on_event:
+            on_event(target["name"], "done", res)
+        return res
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(build, t): t for t in targets}
+        for fut in as_completed(futures):
+            results[futures[fut]["name"]] = fut.result()
+    return results
 
-def save_config(cfg):
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cfg, f)
+# ----- Общая сборка нескольких скриптов -----
+# Один spec-файл: один Analysis на все скрипты, один PYZ и по EXE на скрипт. В onedir
+# все exe кладутся в одну папку <out>/shared с общей _internal, в onefile каждый exe
+# по-прежнему самодостаточен, но анализ зависимостей делается один раз.
 
-config = load_config()
+BUILD_SHARED_NAME = "shared"
 
-def get_default_python():
-    return config.get("python_path") or sys.executable
+SHARED_SPEC_TEMPLATE = """# -*- mode: python ; coding: utf-8 -*-
+# Сгенерировано PythonToolPack: общий анализ для нескольких скриптов
+names = {names!r}
+a = Analysis({scripts!r}, pathex={pathex!r}, excludes={excludes!r}, runtime_hooks={hooks!r})
+pyz = PYZ(a.pure)
 
-# ===== GitHub API AUTH =====
+def scripts_for(name):
+    # a.scripts содержит все точки входа; каждому exe — только своя (плюс runtime-хуки)
+    return [s for s in a.scripts if s[0] == name or s[0] not in names]
 
-GITHUB_TOKEN_KEY = "github_token"
-GITHUB_USER_KEY = "github_user"
+exes = []
+for name in names:
+    if {onefile!r}:
+        exes.append(EXE(pyz, scripts_for(name), a.binaries, a.datas, [], name=name, console=True, icon={icon!r}))
+    else:
+        exes.append(EXE(pyz, scripts_for(name), [], exclude_binaries=True, name=name, console=True, icon={icon!r}))
+if not {onefile!r}:
+    COLLECT(*exes, a.binaries, a.datas, name={collect!r})
+"""
 
-def ask_install_requests():
-    messagebox.showinfo(
-        "Нужна библиотека requests",
-        "Для работы с GitHub и онлайн-операциями установите библиотеку requests"
-    )
+def shared_build_problem(targets):
+    """Почему цели нельзя собрать общим spec-файлом, или None."""
+    names = [os.path.splitext(os.path.basename(t["script"]))[0] for t in targets]
+    dups = sorted({n for n in names if names.count(n) > 1})
+    if dups:
+        return f"одинаковые имена скриптов: {', '.join(dups)}"
+    if BUILD_SHARED_NAME in names:
+        return f"скрипт не может называться {BUILD_SHARED_NAME}.py"
+    return None
 
-def ask_install_jedi():
-    messagebox.showinfo(
-        "Нужна библиотека jedi",
-        "Для автодополнения и интеллектуальных подсказок установите библиотеку jedi"
+def shared_artifact(out_dir, target, onefile):
+    if onefile:
+        return build_artifact(out_dir, target["name"], True)
+    return os.path.join(out_dir, BUILD_SHARED_NAME, target["name"] + EXE_SUFFIX)
+
+def shared_spec_source(targets, onefile, icon=None):
+    return SHARED_SPEC_TEMPLATE.format(
+        names=[t["name"] for t in targets],
+        scripts=[t["script"] for t in targets],
+        pathex=sorted({os.path.dirname(t["script"]) for t in targets}),
+        excludes=sorted({m for t in targets for m in t.get("excludes", ())}),
+        hooks=[startup_hook_path()] if any(t.get("startup_hook") for t in targets) else [],
+        onefile=bool(onefile),
+        icon=[icon] if icon else None,
+        collect=BUILD_SHARED_NAME,
     )
 
-def save_github_token(token, user):
-    config[GITHUB_TOKEN_KEY] = token
-    config[GITHUB_USER_KEY] = user
-    save_config(config)
+def build_shared(python, targets, out_dir, onefile, icon=None, force=False):
+    """Собирает все цели одним запуском PyInstaller; возвращает {имя: результат}."""
+    keys = [build_keys(python, t, onefile, icon) for t in targets]
+    full_key = hashlib.sha256(json.dumps(["shared", [k[0] for k in keys]]).encode("utf-8")).hexdigest()
+    dep_key = hashlib.sha256(json.dumps(["shared", [k[1] for k in keys]]).encode("utf-8")).hexdigest()
+    state_name = "_" + BUILD_SHARED_NAME
+    state = load_build_state(out_dir, state_name)
+    artifacts = {t["name"]: shared_artifact(out_dir, t, onefile) for t in targets}
+    entry = state["artifacts"].get(full_key)
+    if entry and not force and all(os.path.isfile(p) and artifact_stamp(p) == entry["stamps"].get(n)
+                                        for n, p in artifacts.items()):
+        return {n: {"ok": True, "cached": True, "clean": False, "elapsed": 0.0, "artifact": p,
+                    "log": "Ничего не менялось — сборка пропущена."} for n, p in artifacts.items()}
+    work_root = os.path.join(out_dir, BUILD_DIR_NAME, state_name)
+    os.makedirs(work_root, exist_ok=True)
+    spec = os.path.join(work_root, BUILD_SHARED_NAME + ".spec")
+    write_file_atomic(spec, shared_spec_source(targets, onefile, icon))
+    clean = force or state["dep_key"] != dep_key
+    cmd = [python, "-m", "PyInstaller", "--noconfirm", "--distpath", out_dir,
+           "--workpath", os.path.join(work_root, "work")] + (["--clean"] if clean else []) + [spec]
+    started = time.perf_counter()
+    try:
+        if onefile:
+            for t in targets:
+                clear_artifact_conflict(out_dir, t["name"], True)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=work_root)
+        ok, log = result.returncode == 0, result.stdout
+    except Exception as e:
+        ok, log = False, f"Ошибка: {e}"
+    elapsed = time.perf_counter() - started
+    if ok:
+        state["dep_key"] = dep_key
+        state["artifacts"] = {full_key: {"stamps": {n: artifact_stamp(p) for n, p in artifacts.items()},
+                                         "time": time.time()}}
+        save_build_state(out_dir, state_name, state)
+    return {n: {"ok": ok and os.path.exists(p), "cached": False, "clean": clean, "elapsed": elapsed,
+                "artifact": p, "log": log} for n, p in artifacts.items()}
 
-def remove_github_token():
-    config.pop(GITHUB_TOKEN_KEY, None)
-    config.pop(GITHUB_USER_KEY, None)
-    save_config(config)
+# ----- Анализ размера сборки -----
+# Состав сборки берётся из TOC-файлов PyInstaller в рабочей папке: каждый модуль,
+# расширение и файл данных с путём к исходнику. Файлы группируются по пакетам
+# (через инвентарь), а тяжёлые пакеты, до которых нельзя дойти от импортов скрипта
+# по графу зависимостей, помечаются как кандидаты для --exclude-module.
 
-def is_github_authenticated():
-    return GITHUB_TOKEN_KEY in config and GITHUB_USER_KEY in config
+SIZE_HEAVY_THRESHOLD = 1024 * 1024
+SIZE_TOC_TYPES = ("PYMODULE", "PYSOURCE", "EXTENSION", "BINARY", "DATA", "ZIPFILE")
+STDLIB_GROUP = "(стандартная библиотека)"
+SYSTEM_GROUP = "(системные библиотеки)"
 
-def get_github_token():
-    return config.get(GITHUB_TOKEN_KEY) or ""
+def build_work_dir(out_dir, name, shared=False):
+    if shared:
+        return os.path.join(out_dir, BUILD_DIR_NAME, "_" + BUILD_SHARED_NAME, "work", BUILD_SHARED_NAME)
+    return os.path.join(out_dir, BUILD_DIR_NAME, name, "work", name)
 
-def get_github_user():
-    return config.get(GITHUB_USER_KEY) or ""
+def read_toc_entries(work_dir):
+    """{(имя, тип): путь} по всем *.toc рабочей папки."""
+    import ast
+    entries = {}
+    def walk(node):
+        if isinstance(node, (list, tuple)):
+            if (len(node) == 3 and all(isinstance(x, str) for x in node) and node[2] in SIZE_TOC_TYPES):
+                entries[(node[0], node[2])] = node[1]
+                return
+            for child in node:
+                walk(child)
+    for fname in os.listdir(work_dir):
+        if fname.endswith(".toc"):
+            try:
+                with open(os.path.join(work_dir, fname), "r", encoding="utf-8") as f:
+                    walk(ast.literal_eval(f.read()))
+            except (OSError, ValueError, SyntaxError):
+                continue
+    return entries
 
-def github_auth_window():
-    if not HAS_REQUESTS:
-        ask_install_requests()
-        return
-    win = tk.Toplevel(root)
-    win.title("Авторизация через GitHub")
-    win.geometry("400x170")
-    win.grab_set()
-    tk.Label(win, text="Введите Personal Access Token (PAT):").pack(pady=10)
-    entry = tk.Entry(win, show="*", width=40)
-    entry.pack()
-    status = tk.Label(win, text="", fg="red")
-    status.pack(pady=5)
-    def do_auth():
-        token = entry.get().strip()
-        if not token:
-            status.config(text="Введите токен!")
-            return
-        headers = {"Authorization": f"token {token}"}
+def _toc_top_module(name, typecode):
+    if typecode in ("PYMODULE", "PYSOURCE"):
+        return name.split(".")[0]
+    parts = name.replace("\\", "/").split("/")
+    if "lib-dynload" in parts or len(parts) == 1:
+        return parts[-1].split(".")[0]
+    return parts[0]
+
+def package_record_tops(pkg):
+    """Первые компоненты путей из RECORD без расширения — все файлы верхнего уровня пакета."""
+    import csv
+    record = os.path.join(pkg.get("metadata_path") or "", "RECORD")
+    tops = set()
+    if os.path.isfile(record):
+        with open(record, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.reader(f):
+                if row and not row[0].startswith(("..", "/")):
+                    tops.add(row[0].split("/")[0].split(".")[0])
+    return sorted(tops)
+
+def script_imports(script):
+    """Модули верхнего уровня, которые импортирует скрипт и его локальные модули."""
+    import ast
+    names = set()
+    for path in [os.path.abspath(script)] + script_local_modules(script):
         try:
-            resp = requests.get("https://api.github.com/user", headers=headers, timeout=5)
-            if resp.status_code == 200:
-                github_user = resp.json().get("login", "unknown")
-                save_github_token(token, github_user)
-                status.config(text=f"Успешно! Зашли как {github_user}", fg="green")
-                update_github_auth_button()
-                win.after(800, win.destroy)
-            else:
-                status.config(text="Ошибка авторизации!", fg="red")
-        except Exception as e:
-            status.config(text=f"Ошибка: {e}", fg="red")
-    btn_login = tk.Button(win, text="Войти", command=do_auth)
-    btn_login.pack(pady=10)
-    entry.bind('<Return>', lambda e: do_auth())
+            with open(path, "rb") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(a.name.split(".")[0] for a in node.names)
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names.add(node.module.split(".")[0])
+    return names
 
-def logout_github():
-    remove_github_token()
-    update_github_auth_button()
+def analyze_build_size(python, work_dir, scripts):
+    """Группы {name, kind, size, files, modules, reachable, suggest}, от больших к маленьким."""
+    inventory = get_inventory(python)
+    graph = get_dependency_graph(python)
+    site_dirs = [os.path.normcase(os.path.abspath(d)) + os.sep for d in inventory["site_dirs"]]
+    module_dist = {}
+    for pkg in inventory["packages"]:
+        for module in package_top_modules(pkg) + package_record_tops(pkg):
+            module_dist.setdefault(module, pkg["key"])
+    # Дистрибутивы, до которых можно дойти от импортов скриптов по requires
+    reachable = set()
+    stack = [module_dist[m] for s in scripts for m in script_imports(s) if m in module_dist]
+    while stack:
+        key = stack.pop()
+        if key not in reachable:
+            reachable.add(key)
+            stack += [d for d in graph["forward"].get(key, ()) if d in graph["packages"]]
+    groups = {}
+    for (name, typecode), path in read_toc_entries(work_dir).items():
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        top = _toc_top_module(name, typecode)
+        norm = os.path.normcase(os.path.abspath(path))
+        site = next((d for d in site_dirs if norm.startswith(d)), None)
+        if site:
+            # Пакет определяем по первой папке пути внутри site-packages, а не по имени в сборке:
+            # так и хуки PyInstaller, и бинарники вроде <hash>__mypyc попадают к своему пакету
+            top = os.path.abspath(path)[len(site):].split(os.sep)[0].split(".")[0]
+            key = module_dist.get(top, canonical_name(top))
+            title = graph["packages"][key]["name"] if key in graph["packages"] else top
+            kind = "пакет"
+        elif typecode in ("BINARY",) and "lib-dynload" not in name:
+            key, title, kind = SYSTEM_GROUP, SYSTEM_GROUP, "система"
+        else:
+            key, title, kind = STDLIB_GROUP, STDLIB_GROUP, "stdlib"
+        group = groups.setdefault(key, {"key": key, "name": title, "kind": kind, "size": 0, "files": 0,
+                                        "modules": set()})
+        group["size"] += size
+        group["files"] += 1
+        if kind == "пакет" and top.isidentifier():
+            group["modules"].add(top)
+    result = []
+    for group in groups.values():
+        group["reachable"] = group["kind"] != "пакет" or group["key"] in reachable
+        group["suggest"] = (not group["reachable"] and group["size"] >= SIZE_HEAVY_THRESHOLD
+                            and group["key"] != "pyinstaller")
+        group["modules"] = sorted(group["modules"])
+        result.append(group)
+    result.sort(key=lambda g: g["size"], reverse=True)
+    return result
 
-def update_github_auth_button():
-    if is_github_authenticated():
-        btn_github_auth.config(text=f"Выйти ({get_github_user()})", command=logout_github)
-    else:
-        btn_github_auth.config(text="Авторизоваться", command=github_auth_window)
+# ----- Замер запуска собранных exe -----
+# Для замера цель пересобирается в <out>/.build/<имя>/variants/ с крошечным
+# runtime-хуком: если задана переменная PYTHONTOOLPACK_STARTUP_EXIT, exe выходит
+# сразу, как только поднялся интерпретатор (в onefile — уже после распаковки), без
+# запуска самого скрипта, а на Linux ещё и записывает в указанный файл свой пик
+# памяти (VmHWM). В обычные сборки хук не попадает. Вместо хука можно задать
+# «дымовые» аргументы — тогда замеряется сама сборка, и exe работает как обычно.
+# Первый запуск после сборки считается холодным, медиана остальных — тёплым.
 
-# ===== GitHub API: REPOS & FILES & Content =====
+STARTUP_EXIT_ENV = "PYTHONTOOLPACK_STARTUP_EXIT"
+STARTUP_HOOK_NAME = "pyi_rth_pythontoolpack_startup.py"
+STARTUP_HOOK_SOURCE = (
+    "# Сгенерировано PythonToolPack: выход сразу после старта для замера запуска\n"
+    "import os, sys\n"
+    f"_report = os.environ.get({STARTUP_EXIT_ENV!r})\n"
+    "if _report:\n"
+    "    try:\n"
+    "        with open('/proc/self/status') as f, open(_report, 'w') as out:\n"
+    "            out.write(''.join(line for line in f if line.startswith('VmHWM:')))\n"
+    "    except OSError:\n"
+    "        pass\n"
+    "    sys.exit(0)\n"
+)
+STARTUP_TIMEOUT = 60
+STARTUP_HISTORY_FILE = "startup_history.json"
+STARTUP_HISTORY_KEEP = 50
+STARTUP_VARIANTS_DIR = "variants"
 
-def fetch_user_repos():
-    if not HAS_REQUESTS:
-        ask_install_requests()
-        return []
-    headers = {
-        "Authorization": f"token {get_github_token()}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    user = get_github_user()
-    repos = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/users/{user}/repos?per_page=100&page={page}"
-        resp = requests.get(url, headers=headers)
-        if resp.status_code != 200:
-            break
-        data = resp.json()
-        if not data:
-            break
-        repos += [repo["name"] for repo in data]
-        page += 1
-    return repos
+def startup_hook_path():
+    path = os.path.abspath(os.path.join(CACHE_DIR, STARTUP_HOOK_NAME))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == STARTUP_HOOK_SOURCE:
+                return path
+    except OSError:
+        pass
+    write_file_atomic(path, STARTUP_HOOK_SOURCE)
+    return path
 
-def fetch_repo_tree(repo, path=""):
-    if not HAS_REQUESTS:
-        ask_install_requests()
-        return []
-    headers = {
-        "Authorization": f"token {get_github_token()}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    user = get_github_user()
-    url = f"https://api.github.com/repos/{user}/{repo}/contents/{path}" if path else f"https://api.github.com/repos/{user}/{repo}/contents"
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        return []
-    data = resp.json()
-    if isinstance(data, dict):
-        data = [data]
-    return data
+def _peak_memory_windows(proc):
+    import ctypes
+    from ctypes import wintypes
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    if ctypes.windll.psapi.GetProcessMemoryInfo(wintypes.HANDLE(int(proc._handle)), ctypes.byref(counters),
+                                                counters.cb):
+        return counters.PeakWorkingSetSize
+    return None
 
-def fetch_file_content(repo, filepath):
-    if not HAS_REQUESTS:
-        ask_install_requests()
-        return ""
-    headers = {
-        "Authorization": f"token {get_github_token()}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    user = get_github_user()
-    url = f"https://api.github.com/repos/{user}/{repo}/contents/{filepath}"
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        return ""
-    data = resp.json()
-    if data.get("encoding") == "base64":
-        return base64.b64decode(data["content"]).decode("utf-8")
-    return ""
+def _read_reported_peak(path):
+    try:
+        with open(path, "r") as f:
+            fields = f.read().split()
+        return int(fields[1]) * 1024 if len(fields) > 1 else None
+    except (OSError, ValueError):
+        return None
 
-def check_update():
-    if not HAS_REQUESTS:
-        ask_install_requests()
-        return
-    if not is_github_authenticated():
-        messagebox.showwarning("Обновление", "Для обновления авторизуйтесь через GitHub!")
-        return
-    url = "https://api.github.com/repos/Universalingnebula/lazylibs2/contents/lazylibs2_ultimate.py?ref=main"
-    headers = {"Authorization": f"token {get_github_token()}"}
+def run_artifact_once(artifact, args=()):
+    """(время в мс, пиковая память в байтах или None, код выхода) одного запуска."""
+    env = dict(os.environ)
+    report = None
+    if not args:
+        fd, report = tempfile.mkstemp(prefix="startup_", suffix=".txt")
+        os.close(fd)
+        env[STARTUP_EXIT_ENV] = report
+    started = time.perf_counter()
+    proc = subprocess.Popen([artifact] + list(args), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, env=env, cwd=os.path.dirname(artifact))
+    timer = threading.Timer(STARTUP_TIMEOUT, proc.kill)
+    timer.start()
     try:
-        resp = requests.get(url, headers=headers)
-    except Exception as e:
-        messagebox.showerror("Обновление", f"Ошибка запроса: {e}")
-        return
-    if resp.status_code == 200:
-        data = resp.json()
-        content = base64.b64decode(data['content']).decode('utf-8')
-        with open("pythontoolpack_new.py", "w", encoding="utf-8") as f:
-            f.write(content)
-        messagebox.showinfo("Обновление", "Скачана новая версия как pythontoolpack_new.py\nПерезапустите приложение вручную для обновления.")
-    else:
-        messagebox.showerror("Обновление", f"Не удалось проверить обновления. Код: {resp.status_code}")
+        if os.name == "nt":
+            code = proc.wait()
+            elapsed = (time.perf_counter() - started) * 1000
+            peak = _peak_memory_windows(proc)
+        else:
+            # rusage из wait4 учитывает и дочерний процесс, который запускает загрузчик onefile
+            _, status, usage = os.wait4(proc.pid, 0)
+            elapsed = (time.perf_counter() - started) * 1000
+            # os.waitstatus_to_exitcode появился только в 3.9
+            code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            proc.returncode = code
+            scale = 1 if sys.platform == "darwin" else 1024
+            peak = usage.ru_maxrss * scale
+            # Но ru_maxrss наследует пик копии нашего процесса до exec: если он не больше
+            # нашего собственного, настоящего значения из него не узнать
+            import resource
+            if peak <= resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale:
+                peak = None
+    finally:
+        timer.cancel()
+        if report:
+            reported = _read_reported_peak(report)
+            peak = reported or peak
+            try:
+                os.remove(report)
+            except OSError:
+                pass
+    return elapsed, peak, code
+
+def measure_startup(artifact, runs=5, args=()):
+    """Холодный (первый) и тёплый (медиана остальных) запуск, пиковая память."""
+    samples = [run_artifact_once(artifact, args) for _ in range(max(2, runs))]
+    failed = [s for s in samples if s[2] != 0]
+    peaks = [s[1] for s in samples if s[1] is not None]
+    return {"cold_ms": round(samples[0][0], 1), "warm_ms": round(_median([s[0] for s in samples[1:]]), 1),
+            "peak": max(peaks) if peaks else None, "runs": len(samples), "failed": len(failed),
+            "code": failed[0][2] if failed else 0}
+
+def startup_target(target, args):
+    # Хук нужен, только когда exe запускается без дымовых аргументов
+    return target if args else dict(target, startup_hook=True)
+
+def startup_variant_dir(out_dir, name, onefile):
+    # Второй вариант собирается отдельно: onefile <out>/name и onedir <out>/name/ не уживутся вместе
+    return os.path.join(out_dir, BUILD_DIR_NAME, name, STARTUP_VARIANTS_DIR, "onefile" if onefile else "onedir")
+
+def _startup_history_path(out_dir, name):
+    return os.path.join(out_dir, BUILD_DIR_NAME, name, STARTUP_HISTORY_FILE)
+
+def load_startup_history(out_dir, name):
+    try:
+        with open(_startup_history_path(out_dir, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def record_startup(out_dir, name, entry):
+    """Дописывает замер в историю цели; возвращает предыдущий замер того же вида или None."""
+    history = load_startup_history(out_dir, name)
+    previous = next((h for h in reversed(history) if h["mode"] == entry["mode"] and h["args"] == entry["args"]
+                     and not h["failed"]), None)
+    history = (history + [entry])[-STARTUP_HISTORY_KEEP:]
+    try:
+        write_file_atomic(_startup_history_path(out_dir, name), json.dumps(history, indent=1))
+    except OSError:
+        pass
+    return previous
+
+def benchmark_builds(python, targets, results, out_dir, onefile, shared, runs=5, args=(), compare=False,
+                     icon=None, on_result=None):
+    """Замеряет запуск собранных целей; при compare дособирает и замеряет второй вариант упаковки.
+
+    Без args замеряются копии с хуком из startup_variant_dir, с args — сами сборки.
+
+    on_result(имя, строка) получает {name, mode, artifact, size, cold_ms, warm_ms, peak, failed, previous}
+    или {name, mode, error}."""
+    hook_args = [] if args else [STARTUP_EXIT_ENV]
+    targets = [t for t in targets if results.get(t["name"]) and results[t["name"]]["ok"]]
+    measured_results = results
+    if not args and shared and targets:
+        measured_results = build_shared(python, [startup_target(t, args) for t in targets],
+                                        startup_variant_dir(out_dir, "_" + BUILD_SHARED_NAME, onefile),
+                                        onefile, icon)
+    for target in targets:
+        name = target["name"]
+        mode = ("onefile" if onefile else "onedir") + (" (общая)" if shared else "")
+        if args or shared:
+            res = measured_results[name]
+        else:
+            res = build_target(python, startup_target(target, args),
+                               startup_variant_dir(out_dir, name, onefile), onefile, icon)
+        variants = []
+        if res["ok"]:
+            variants.append((mode, res["artifact"], onefile))
+        elif on_result:
+            on_result(name, {"name": name, "mode": mode, "error": (res["log"].strip().splitlines() or [""])[-1]})
+        if compare:
+            other = not onefile
+            built = build_target(python, startup_target(target, args), startup_variant_dir(out_dir, name, other),
+                                 other, icon)
+            if built["ok"]:
+                variants.append(("onefile" if other else "onedir", built["artifact"], other))
+            elif on_result:
+                on_result(name, {"name": name, "mode": "onefile" if other else "onedir",
+                                 "error": (built["log"].strip().splitlines() or [""])[-1]})
+        for label, artifact, is_onefile in variants:
+            try:
+                measured = measure_startup(artifact, runs, args)
+            except Exception as e:
+                if on_result:
+                    on_result(name, {"name": name, "mode": label, "error": str(e)})
+                continue
+            entry = dict(measured, mode=label, args=list(args) or hook_args, time=time.time(),
+                         size=path_size(artifact if is_onefile else os.path.dirname(artifact)))
+            previous = record_startup(out_dir, name, entry)
+            if on_result:
+                on_result(name, dict(entry, name=name, artifact=artifact, previous=previous))
 
 # ===== Основной GUI =====
 
@@ -244,75 +3121,6 @@ def show_install_mode():
     btn_editor_mode.config(relief='raised')
     btn_help.config(relief='raised')
 
-def show_all_mode():
-    frame_install.pack_forget()
-    frame_transform.pack_forget()
-    frame_editor.pack_forget()
-    frame_help.pack_forget()
-    frame_all.pack(fill='both', expand=True)
-    btn_install_mode.config(relief='raised')
-    btn_all_mode.config(relief='sunken')
-    btn_transform_mode.config(relief='raised')
-    btn_editor_mode.config(relief='raised')
-    btn_help.config(relief='raised')
-    clear_frame(scrollable_all)
-    progress_bar.pack(pady=5)
-    progress_bar.start(10)
-    def load():
-        packages = fetch_installed_packages()
-        def draw():
-            progress_bar.stop()
-            progress_bar.pack_forget()
-            if not packages:
-                tk.Label(scrollable_all, text="Пакеты не найдены", font=("Arial", 14)).pack(pady=30)
-            for pkg in packages:
-                f = tk.Frame(scrollable_all, pady=7, bd=1, relief='solid')
-                f.pack(fill='x', padx=5)
-                tk.Label(f, text=pkg['name'], font=("Arial", 14, "bold")).pack(anchor='w')
-                tk.Label(f, text=f"Версия: {pkg['version']}", font=("Arial", 10)).pack(anchor='w')
-                btns = tk.Frame(f)
-                btns.pack(anchor='w', pady=5)
-                def uninstall(name=pkg['name']):
-                    answer = messagebox.askyesno("Подтверждение", f"Удалить {name}?")
-                    if not answer:
-                        return
-                    label_status.config(text=f"Удаление {name}...")
-                    progress_bar.pack(pady=5)
-                    progress_bar.start(10)
-                    def run():
-                        result = subprocess.run([get_default_python(), '-m', 'pip', 'uninstall', '-y', name],
-                                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                        msg = result.stdout + '\n' + result.stderr
-                        def update():
-                            progress_bar.stop()
-                            progress_bar.pack_forget()
-                            label_status.config(text=msg)
-                            show_all_mode()
-                        root.after(0, update)
-                    threading.Thread(target=run).start()
-                def upgrade(name=pkg['name']):
-                    label_status.config(text=f"Обновление {name}...")
-                    progress_bar.pack(pady=5)
-                    progress_bar.start(10)
-                    def run():
-                        subprocess.run([get_default_python(), '-m', 'pip', 'install', '--upgrade', name])
-                        root.after(0, show_all_mode)
-                    threading.Thread(target=run).start()
-                def show_details(name=pkg['name']):
-                    result = subprocess.run([get_default_python(), '-m', 'pip', 'show', name],
-                                            stdout=subprocess.PIPE, text=True)
-                    win = tk.Toplevel(root)
-                    win.title(f"Информация о {name}")
-                    txt = tk.Text(win, wrap='word')
-                    txt.insert('1.0', result.stdout)
-                    txt.config(state='normal')
-                    txt.pack(expand=True, fill='both')
-                tk.Button(btns, text="Удалить", command=uninstall).pack(side='left', padx=5)
-                tk.Button(btns, text="Обновить", command=upgrade).pack(side='left', padx=5)
-                tk.Button(btns, text="Подробнее", command=show_details).pack(side='left', padx=5)
-        root.after(0, draw)
-    threading.Thread(target=load).start()
-
 def show_transform_mode():
     frame_install.pack_forget()
     frame_all.pack_forget()
@@ -343,7 +3151,69 @@ def make_root():
     r.geometry("1100x750")
     return r
 
+# ===== Замер холодного старта =====
+# --startup-bench      — запустить GUI, дождаться первого кадра, вывести JSON и выйти
+# --startup-bench-all  — прогнать --startup-bench с каждым набором опциональных зависимостей
+
+STARTUP_BENCH_DEPS = ("requests", "jedi")
+startup_marks = {}
+
+def report_first_frame():
+    root.update_idletasks()
+    root.update()
+    startup_marks["first_frame"] = time.perf_counter() - _STARTUP_T0
+    result = {k: round(v * 1000, 1) for k, v in startup_marks.items()}
+    result["loaded"] = [m for m in STARTUP_BENCH_DEPS if m in sys.modules]
+    print(json.dumps(result), flush=True)
+    root.destroy()
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+def run_startup_benchmark(runs=5):
+    script = os.path.abspath(__file__)
+    installed = [d for d in STARTUP_BENCH_DEPS if probe_module(d)]
+    variants = [("все установленные", "")]
+    variants += [(f"без {d}", d) for d in installed]
+    if len(installed) > 1:
+        variants.append(("без " + " и ".join(installed), ",".join(installed)))
+    print(f"Установлены: {', '.join(installed) or 'нет'}; прогонов на вариант: {runs}")
+    for label, disabled in variants:
+        env = dict(os.environ, PYTHONTOOLPACK_DISABLE=disabled)
+        frames, walls, loaded = [], [], set()
+        for _ in range(runs):
+            t = time.perf_counter()
+            proc = subprocess.run([sys.executable, script, "--startup-bench"], env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=120)
+            walls.append((time.perf_counter() - t) * 1000)
+            lines = proc.stdout.strip().splitlines()
+            if proc.returncode != 0 or not lines:
+                print(f"{label}: ошибка запуска\n{proc.stderr}")
+                return 1
+            data = json.loads(lines[-1])
+            frames.append(data["first_frame"])
+            loaded.update(data["loaded"])
+        print(f"{label:<30} первый кадр {_median(frames):7.1f} мс   процесс целиком {_median(walls):7.1f} мс"
+              f"   загружено до кадра: {', '.join(sorted(loaded)) or '-'}")
+    # Для сравнения: сколько стоил бы прямой импорт каждой зависимости при старте
+    for dep in installed:
+        code = f"import time; t = time.perf_counter(); import {dep}; print((time.perf_counter() - t) * 1000)"
+        samples = []
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+            if proc.returncode == 0:
+                samples.append(float(proc.stdout.strip()))
+        if samples:
+            print(f"import {dep:<23} {_median(samples):7.1f} мс (отложено до первого использования)")
+    return 0
+
+if __name__ == "__main__" and "--startup-bench-all" in sys.argv:
+    sys.exit(run_startup_benchmark())
+
 root = make_root()
+startup_marks["make_root"] = time.perf_counter() - _STARTUP_T0
 
 frame_top = tk.Frame(root)
 frame_top.pack(fill='x')
@@ -369,8 +3239,24 @@ frame_auth = tk.Frame(frame_buttons)
 frame_auth.pack(side='right', padx=5)
 btn_github_auth = tk.Button(frame_auth, text="Авторизоваться")
 btn_github_auth.pack(side='left', padx=3)
+label_github_quota = tk.Label(frame_auth, text="", fg="gray")
+label_github_quota.pack(side='left', padx=3)
+
+def update_github_quota_label(quota):
+    if quota["remaining"] is None:
+        return
+    text = f"API: {quota['remaining']}/{quota['limit']}"
+    if quota["paused_until"]:
+        text += " (пауза до " + time.strftime("%H:%M:%S", time.localtime(quota["paused_until"])) + ")"
+    color = "red" if quota["paused_until"] or quota["remaining"] < GITHUB_PACE_BELOW else "gray"
+    label_github_quota.config(text=text, fg=color)
+
+github_quota_listeners.append(lambda quota: root.after(0, lambda: update_github_quota_label(quota)))
 btn_check_update = tk.Button(frame_buttons, text="Проверить обновления", command=check_update)
 btn_check_update.pack(side='right', padx=5)
+auto_update_var = tk.BooleanVar(value=bool(config.get(UPDATE_CHECK_KEY)))
+tk.Checkbutton(frame_buttons, text="Автопроверка", variable=auto_update_var,
+               command=toggle_auto_update_check).pack(side='right')
 
 # ========== Простой редактор + Github Open + Имя файла ==========
 
@@ -397,6 +3283,7 @@ def set_editor_filename(name=""):
 def open_file():
     filename = filedialog.askopenfilename(filetypes=[("Python files", "*.py"), ("All files", "*.*")])
     if filename:
+        stage_current_github_file()
         with open(filename, "r", encoding="utf-8") as f:
             content = f.read()
         editor_text.delete(1.0, tk.END)
@@ -404,6 +3291,15 @@ def open_file():
         set_editor_filename(os.path.basename(filename))
         editor_text.filepath = filename
         editor_set_title(filename)
+        editor_text.github_source = None
+
+def new_file():
+    stage_current_github_file()
+    editor_text.delete(1.0, tk.END)
+    set_editor_filename("")
+    editor_set_title()
+    editor_text.filepath = None
+    editor_text.github_source = None
 
 def save_file():
     name = editor_filename_entry.get().strip()
@@ -518,7 +3414,7 @@ def show_autocomplete(event=None):
     code = editor_text.get("1.0", "end-1c")
     index = editor_text.index(tk.INSERT)
     row, col = map(int, index.split('.'))
-    script = jedi.Script(code, path='')
+    script = get_jedi().Script(code, path='')
     try:
         completions = script.complete(line=row, column=col)
         if completions:
@@ -542,7 +3438,7 @@ def show_intelli(event=None):
     code = editor_text.get("1.0", "end-1c")
     index = editor_text.index(tk.INSERT)
     row, col = map(int, index.split('.'))
-    script = jedi.Script(code, path='')
+    script = get_jedi().Script(code, path='')
     try:
         definitions = script.goto(line=row, column=col)
         if definitions:
@@ -603,42 +3499,91 @@ def github_open_in_editor():
     files_scroll.pack(side='right', fill='y')
     path_label = tk.Label(right, text="", fg="blue")
     path_label.pack(anchor='w')
+    mirror_bar = tk.Frame(right)
+    mirror_bar.pack(fill='x', pady=2)
+    btn_mirror = tk.Button(mirror_bar, text="Зеркало репозитория")
+    btn_mirror.pack(side='left')
+    search_entry = tk.Entry(mirror_bar, width=30)
+    search_entry.pack(side='left', padx=5)
+    btn_search = tk.Button(mirror_bar, text="Поиск по репозиторию")
+    btn_search.pack(side='left')
+    mirror_status = tk.Label(right, text="", fg="gray")
+    mirror_status.pack(anchor='w')
 
     nav_stack = []
     cur_repo = [None]
     cur_path = [""]
+    cur_index = [None]
 
     def load_repos():
         repo_list.delete(0, tk.END)
         repo_list.insert(tk.END, "Загрузка...")
+        received = {}
+        def add_page(page, names):
+            # Страницы приходят в любом порядке — вставляем каждую на своё место
+            if not received:
+                repo_list.delete(0, tk.END)
+            pos = sum(len(received[p]) for p in received if p < page)
+            received[page] = names
+            for i, name in enumerate(names):
+                repo_list.insert(pos + i, name)
         def worker():
-            repos = fetch_user_repos()
+            error = None
+            try:
+                repos = fetch_user_repos(on_page=lambda page, names: win.after(0, lambda: add_page(page, names)))
+            except Exception as e:
+                repos, error = [], e
             def update():
-                repo_list.delete(0, tk.END)
-                if repos:
-                    for r in repos:
-                        repo_list.insert(tk.END, r)
-                else:
-                    repo_list.insert(tk.END, "Нет репозиториев")
+                if error and received:
+                    repo_list.insert(tk.END, f"Ошибка: {error}")
+                elif not repos:
+                    repo_list.delete(0, tk.END)
+                    repo_list.insert(tk.END, f"Ошибка: {error}" if error else "Нет репозиториев")
             win.after(0, update)
         threading.Thread(target=worker).start()
 
+    shown_items = {}
+
+    def show_items(path, items):
+        shown_items.clear()
+        shown_items.update((itm['name'], itm) for itm in items)
+        files_list.delete(0, tk.END)
+        if path:
+            files_list.insert(tk.END, "[..] (назад)")
+        for itm in items:
+            if itm['type'] == 'dir':
+                files_list.insert(tk.END, f"[DIR] {itm['name']}")
+            elif itm['type'] == 'file':
+                files_list.insert(tk.END, itm['name'])
+        path_label.config(text=f"/{path}" if path else "/")
+        start_prefetch(cur_repo[0], items)
+
     def load_files(repo, path=""):
+        index = cur_index[0]
+        if index and index["repo"] == repo:
+            items = repo_index_listing(index, path)
+            if items is not None:
+                show_items(path, items)
+                return
         files_list.delete(0, tk.END)
         files_list.insert(tk.END, "Загрузка...")
         def worker():
-            items = fetch_repo_tree(repo, path)
-            items_sorted = sorted(items, key=lambda x: (x['type'] != 'dir', x['name'].lower()))
+            error = None
+            try:
+                if index and index["repo"] == repo:
+                    items = repo_index_fill(index, path)
+                else:
+                    items = sort_tree_items(fetch_repo_tree(repo, path))
+            except Exception as e:
+                items, error = [], e
             def update():
-                files_list.delete(0, tk.END)
-                if path:
-                    files_list.insert(tk.END, "[..] (назад)")
-                for itm in items_sorted:
-                    if itm['type'] == 'dir':
-                        files_list.insert(tk.END, f"[DIR] {itm['name']}")
-                    elif itm['type'] == 'file':
-                        files_list.insert(tk.END, itm['name'])
-                path_label.config(text=f"/{path}" if path else "/")
+                if cur_repo[0] != repo or cur_path[0] != path:
+                    return
+                if error:
+                    files_list.delete(0, tk.END)
+                    files_list.insert(tk.END, f"Ошибка: {error}")
+                else:
+                    show_items(path, items)
             win.after(0, update)
         threading.Thread(target=worker).start()
 
@@ -648,8 +3593,139 @@ def github_open_in_editor():
         repo = repo_list.get(sel[0])
         cur_repo[0] = repo
         cur_path[0] = ""
+        cur_index[0] = None
         nav_stack.clear()
-        load_files(repo, "")
+        files_list.delete(0, tk.END)
+        files_list.insert(tk.END, "Загрузка...")
+        def worker():
+            try:
+                index = get_repo_index(repo)
+            except Exception:
+                index = None
+            if index is None:
+                index = mirror_repo_index(repo)
+            def update():
+                if cur_repo[0] != repo:
+                    return
+                cur_index[0] = index
+                update_mirror_status()
+                load_files(repo, cur_path[0])
+            win.after(0, update)
+        threading.Thread(target=worker).start()
+
+    def update_mirror_status():
+        index = cur_index[0]
+        if not index:
+            mirror_status.config(text="")
+        elif index.get("offline"):
+            mirror_status.config(text=f"Нет сети — открыто зеркало {index['sha'][:7]}")
+        elif mirror_exists(index["repo"], index["sha"]):
+            preload_mirror_index(index["repo"], index["sha"])
+            mirror_status.config(text=f"Зеркало {index['sha'][:7]} готово, файлы открываются с диска")
+        else:
+            mirror_status.config(text="Зеркала нет — поиск недоступен")
+
+    def make_mirror():
+        index = cur_index[0]
+        if not index:
+            messagebox.showinfo("Зеркало", "Сначала выберите репозиторий")
+            return
+        if index.get("offline") or mirror_exists(index["repo"], index["sha"]):
+            update_mirror_status()
+            return
+        repo, sha = index["repo"], index["sha"]
+        btn_mirror.config(state="disabled")
+        def progress(text):
+            win.after(0, lambda: mirror_status.config(text=text))
+        def worker():
+            error = None
+            try:
+                folder = mirror_repo(repo, sha, progress)
+                count = len(load_mirror_index(folder)["files"])
+            except Exception as e:
+                error = e
+            def update():
+                btn_mirror.config(state="normal")
+                if error:
+                    mirror_status.config(text=f"Ошибка: {error}")
+                else:
+                    mirror_status.config(text=f"Зеркало {sha[:7]} готово: {count} текстовых файлов в индексе")
+            win.after(0, update)
+        threading.Thread(target=worker).start()
+
+    def open_in_editor(selected_file, content, line=None, sha=None):
+        # Несохранённые правки текущего GitHub-файла не теряем — откладываем в коммит
+        stage_current_github_file()
+        index = cur_index[0]
+        pending = github_pending_changes.get((cur_repo[0], selected_file))
+        if pending:
+            content, sha = pending["content"], pending["base_sha"]
+        if content is not None:
+            editor_text.delete(1.0, tk.END)
+            editor_text.insert(1.0, content)
+        set_editor_filename(os.path.basename(selected_file))
+        editor_text.filepath = None
+        editor_text.github_source = {
+            "repo": cur_repo[0], "path": selected_file, "sha": sha,
+            "branch": index.get("branch") if index else None,
+        }
+        editor_set_title(selected_file + " (GitHub)")
+        if line:
+            editor_text.mark_set("insert", f"{line}.0")
+            editor_text.see(f"{line}.0")
+        win.destroy()
+
+    def search_repo():
+        query = search_entry.get().strip()
+        index = cur_index[0]
+        if not query:
+            return
+        if not index or not mirror_exists(index["repo"], index["sha"]):
+            messagebox.showinfo("Поиск", "Для поиска сначала создайте зеркало репозитория")
+            return
+        repo, sha = index["repo"], index["sha"]
+        btn_search.config(state="disabled")
+        mirror_status.config(text="Поиск...")
+        def worker():
+            started = time.perf_counter()
+            try:
+                results, error = search_mirror(repo, sha, query), None
+            except Exception as e:
+                results, error = [], e
+            elapsed = (time.perf_counter() - started) * 1000
+            win.after(0, lambda: show_results(index, repo, sha, query, results, elapsed, error))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_results(index, repo, sha, query, results, elapsed, error):
+        if not win.winfo_exists():
+            return
+        btn_search.config(state="normal")
+        update_mirror_status()
+        if error:
+            messagebox.showerror("Поиск", f"Ошибка: {error}", parent=win)
+            return
+        res_win = tk.Toplevel(win)
+        res_win.title(f"Поиск: {query}")
+        tk.Label(res_win, text=f"Найдено: {len(results)} за {elapsed:.0f} мс (двойной щелчок — открыть)").pack(anchor='w')
+        res_list = tk.Listbox(res_win, width=120, height=30, font=("Consolas", 10))
+        res_list.pack(side='left', fill='both', expand=True)
+        res_scroll = tk.Scrollbar(res_win, command=res_list.yview)
+        res_list.config(yscrollcommand=res_scroll.set)
+        res_scroll.pack(side='right', fill='y')
+        for rel, lineno, line in results:
+            res_list.insert(tk.END, f"{rel}:{lineno}: {line}")
+        def open_result(evt):
+            sel = res_list.curselection()
+            if not sel:
+                return
+            rel, lineno, _ = results[sel[0]]
+            data = read_mirror_file(repo, sha, rel)
+            if data is None:
+                messagebox.showerror("Ошибка", "Не удалось прочитать файл из зеркала")
+                return
+            itm = repo_index_item(index, rel)
+            open_in_editor(rel, data.decode("utf-8"), lineno, sha=itm["sha"] if itm else git_blob_sha(data))
+        res_list.bind("<Double-Button-1>", open_result)
 
     def on_file_select(evt):
         sel = files_list.curselection()
@@ -672,30 +3748,175 @@ def github_open_in_editor():
             load_files(cur_repo[0], new_path)
         else:
             selected_file = (cur_path[0] + "/" + fname).strip("/")
+            sha = shown_items.get(fname, {}).get("sha")
+            index = cur_index[0]
+            ref = index["sha"] if index and index["repo"] == cur_repo[0] else None
+            pending = (cur_repo[0], selected_file) in github_pending_changes
+            if pending or (sha and git_blob_sha(editor_text.get("1.0", "end-1c").encode("utf-8")) == sha):
+                # Файл уже есть в редакторе или в отложенных правках — качать нечего
+                open_in_editor(selected_file, None, sha=sha)
+                return
             def worker():
-                content = fetch_file_content(cur_repo[0], selected_file)
+                error = None
+                try:
+                    content = fetch_file_content(cur_repo[0], selected_file, sha=sha, ref=ref)
+                except Exception as e:
+                    content, error = None, e
                 def update():
-                    if content:
-                        editor_text.delete(1.0, tk.END)
-                        editor_text.insert(1.0, content)
-                        set_editor_filename(os.path.basename(selected_file))
-                        editor_text.filepath = None
-                        editor_set_title(selected_file + " (GitHub)")
-                        win.destroy()
+                    if error:
+                        messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {error}")
+                    elif content is not None:
+                        open_in_editor(selected_file, content, sha=sha)
+                    else:
+                        messagebox.showerror("Ошибка", "Не удалось загрузить файл")
+                win.after(0, update)
+            threading.Thread(target=worker).start()
+
+    btn_mirror.config(command=make_mirror)
+    btn_search.config(command=search_repo)
+    search_entry.bind('<Return>', lambda e: search_repo())
+    repo_list.bind("<<ListboxSelect>>", on_repo_select)
+    files_list.bind("<<ListboxSelect>>", on_file_select)
+    win.bind("<Destroy>", lambda e: cancel_prefetch())
+    load_repos()
+
+def update_github_save_button():
+    count = len(github_pending_changes)
+    btn_github_save.config(text=f"Сохранить на GitHub ({count})" if count else "Сохранить на GitHub")
+
+def stage_current_github_file():
+    src = getattr(editor_text, "github_source", None)
+    if not src:
+        return False
+    content = editor_text.get("1.0", "end-1c")
+    key = (src["repo"], src["path"])
+    if git_blob_sha(content.encode("utf-8")) == src["sha"]:
+        github_pending_changes.pop(key, None)
+    else:
+        github_pending_changes[key] = {
+            "repo": src["repo"], "path": src["path"], "content": content,
+            "base_sha": src["sha"], "branch": src["branch"],
+        }
+    update_github_save_button()
+    return True
+
+def github_save_window():
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return
+    if not is_github_authenticated():
+        messagebox.showinfo("GitHub", "Сначала выполните авторизацию через GitHub!")
+        return
+    stage_current_github_file()
+
+    win = tk.Toplevel(root)
+    win.title("Сохранить на GitHub")
+    win.geometry("600x400")
+    win.grab_set()
+    tk.Label(win, text="Изменённые файлы (уйдут одним коммитом в каждый репозиторий):").pack(anchor='w', padx=6)
+    changes_list = tk.Listbox(win, selectmode='extended', height=12)
+    changes_list.pack(fill='both', expand=True, padx=6)
+    tk.Label(win, text="Сообщение коммита:").pack(anchor='w', padx=6)
+    message_entry = tk.Entry(win, width=70)
+    message_entry.pack(fill='x', padx=6)
+    status = tk.Label(win, text="", justify='left')
+    status.pack(anchor='w', padx=6, pady=3)
+    btns = tk.Frame(win)
+    btns.pack(pady=5)
+    keys = []
+
+    def refresh():
+        keys[:] = sorted(github_pending_changes)
+        changes_list.delete(0, tk.END)
+        for repo, path in keys:
+            new = "" if github_pending_changes[(repo, path)]["base_sha"] else " (новый)"
+            changes_list.insert(tk.END, f"{repo}: {path}{new}")
+        if not message_entry.get():
+            message_entry.insert(0, "Обновление файлов через PythonToolPack")
+        update_github_save_button()
+
+    def add_current():
+        if getattr(editor_text, "github_source", None):
+            stage_current_github_file()
+            refresh()
+            return
+        repo = simpledialog.askstring("Новый файл", "Репозиторий:", parent=win)
+        if not repo:
+            return
+        path = simpledialog.askstring("Новый файл", "Путь в репозитории:", parent=win,
+                                      initialvalue=editor_filename_entry.get().strip())
+        if not path:
+            return
+        path = path.strip("/")
+        editor_text.github_source = {"repo": repo, "path": path, "sha": None, "branch": None}
+        editor_set_title(path + " (GitHub)")
+        stage_current_github_file()
+        refresh()
+
+    def remove_selected():
+        for i in changes_list.curselection():
+            github_pending_changes.pop(keys[i], None)
+        refresh()
+
+    def do_commit():
+        message = message_entry.get().strip()
+        if not github_pending_changes:
+            status.config(text="Нет изменений для сохранения", fg="red")
+            return
+        if not message:
+            status.config(text="Введите сообщение коммита", fg="red")
+            return
+        by_repo = {}
+        for change in github_pending_changes.values():
+            by_repo.setdefault(change["repo"], []).append(change)
+        status.config(text="Сохранение...", fg="black")
+        btn_commit.config(state="disabled")
+        def worker():
+            lines, done = [], []
+            for repo, changes in by_repo.items():
+                try:
+                    branch = next((c["branch"] for c in changes if c["branch"]), None) or get_repo_default_branch(repo)
+                    commit_sha, blobs = commit_files_to_github(repo, branch, changes, message)
+                    if commit_sha:
+                        lines.append(f"{repo}: коммит {commit_sha[:7]} в {branch}, файлов: {len(blobs)}")
                     else:
-                        messagebox.showerror("Ошибка", "Не удалось загрузить файл")
-                win.after(0, update)
-            threading.Thread(target=worker).start()
+                        lines.append(f"{repo}: изменений относительно GitHub нет")
+                    done.append((repo, changes, blobs))
+                except Exception as e:
+                    lines.append(f"{repo}: {e}")
+            def update():
+                src = getattr(editor_text, "github_source", None)
+                for repo, changes, blobs in done:
+                    for change in changes:
+                        key = (repo, change["path"])
+                        committed = blobs.get(change["path"]) or git_blob_sha(change["content"].encode("utf-8"))
+                        pending = github_pending_changes.get(key)
+                        if pending and pending["content"] == change["content"]:
+                            github_pending_changes.pop(key)
+                        elif pending:
+                            # Пока шёл коммит, файл застейджили заново — правки остаются, но уже поверх коммита
+                            pending["base_sha"] = committed
+                        if src and (src["repo"], src["path"]) == key:
+                            src["sha"] = committed
+                btn_commit.config(state="normal")
+                status.config(text="\n".join(lines), fg="green" if len(done) == len(by_repo) else "red")
+                refresh()
+            win.after(0, update)
+        threading.Thread(target=worker).start()
 
-    repo_list.bind("<<ListboxSelect>>", on_repo_select)
-    files_list.bind("<<ListboxSelect>>", on_file_select)
-    load_repos()
+    tk.Button(btns, text="Добавить текущий файл", command=add_current).pack(side='left', padx=3)
+    tk.Button(btns, text="Убрать выбранные", command=remove_selected).pack(side='left', padx=3)
+    btn_commit = tk.Button(btns, text="Коммит", command=do_commit)
+    btn_commit.pack(side='left', padx=3)
+    refresh()
 
-tk.Button(toolbar, text="Новый", command=lambda: (editor_text.delete(1.0, tk.END), set_editor_filename(""), editor_set_title())).pack(side='left')
+tk.Button(toolbar, text="Новый", command=new_file).pack(side='left')
 tk.Button(toolbar, text="Открыть", command=open_file).pack(side='left')
 tk.Button(toolbar, text="Открыть с GitHub", command=github_open_in_editor).pack(side='left')
 tk.Button(toolbar, text="Сохранить", command=save_file).pack(side='left')
 tk.Button(toolbar, text="Сохранить как", command=save_file_as).pack(side='left')
+btn_github_save = tk.Button(toolbar, text="Сохранить на GitHub", command=github_save_window)
+btn_github_save.pack(side='left')
 tk.Button(toolbar, text="Выполнить", command=run_code).pack(side='left')
 tk.Button(toolbar, text="Найти", command=find_text).pack(side='left')
 tk.Button(toolbar, text="Заменить", command=replace_text).pack(side='left')
@@ -707,8 +3928,6 @@ editor_filename_entry = tk.Entry(toolbar, width=30)
 editor_filename_entry.pack(side='left')
 
 # ========== ДОБАВЛЕНО: Кнопка "Связь" и функционал jedi для редактора ==========
-import keyword
-import threading
 
 # Цвета для типов
 SVYAZ_COLORS = {
@@ -718,13 +3937,6 @@ SVYAZ_COLORS = {
 }
 svyaz_tag = "svyaz_highlight"
 
-# Проверяем наличие jedi
-try:
-    import jedi
-    HAS_JEDI = True
-except ImportError:
-    HAS_JEDI = False
-
 # Для debounce
 highlight_job = [None]  # используем список чтобы изменять из вложенной функции
 highlight_args = [None]
@@ -771,7 +3983,7 @@ def run_highlight_thread():
     code_lines = code.splitlines()
     def do_jedi():
         try:
-            script = jedi.Script(code, path='')
+            script = get_jedi().Script(code, path='')
             names = script.get_references(line=row, column=col, include_builtins=False)
         except Exception:
             names = []
@@ -837,16 +4049,121 @@ label_entry = tk.Label(frame_install, text="Введите название би
 label_entry.pack(pady=5)
 entry_package = tk.Entry(frame_install, width=40)
 entry_package.pack()
+package_suggest_box = tk.Listbox(frame_install, width=40, height=8)
+label_package_hint = tk.Label(frame_install, text="", fg="gray")
+label_package_hint.pack()
 label_version = tk.Label(frame_install, text="Введите версию (опционально):")
 label_version.pack(pady=5)
-entry_version = tk.Entry(frame_install, width=40)
+entry_version = ttk.Combobox(frame_install, width=38)
 entry_version.pack()
 label_python = tk.Label(frame_install, text="Путь к Python (опционально):")
 label_python.pack(pady=5)
-entry_python = tk.Entry(frame_install, width=40)
+entry_python = ttk.Combobox(frame_install, width=38)
 entry_python.pack()
 entry_python.insert(0, config.get("python_path", ""))
 
+# Подсказки берутся из локального индекса имён PyPI (load_pypi_names) — на нажатие
+# клавиши сеть не трогается. Версии подгружаются один раз на выбранный пакет.
+
+package_suggest_job = [None]
+package_suggest_gen = [0]
+package_versions_for = [None]
+pypi_names_loading = [False]
+
+def start_pypi_names_load():
+    if pypi_names_loading[0]:
+        return
+    pypi_names_loading[0] = True
+    def load():
+        load_pypi_names()
+        root.after(0, lambda: label_package_hint.config(
+            text=f"Индекс PyPI: {pypi_names['count']} пакетов" if pypi_names["count"] else ""))
+    threading.Thread(target=load, daemon=True).start()
+
+def hide_package_suggestions(event=None):
+    package_suggest_box.pack_forget()
+
+def show_package_suggestions(names):
+    package_suggest_box.delete(0, 'end')
+    for name in names:
+        package_suggest_box.insert('end', name)
+    if names:
+        package_suggest_box.pack(after=entry_package)
+    else:
+        hide_package_suggestions()
+
+def update_package_suggestions():
+    text = entry_package.get().strip()
+    package_suggest_gen[0] += 1
+    gen = package_suggest_gen[0]
+    if not text or not pypi_names["count"]:
+        hide_package_suggestions()
+        label_package_hint.config(text="")
+        return
+    def work():
+        names = suggest_packages(text)
+        hint = ""
+        if not pypi_name_exists(text):
+            close = fuzzy_packages(text) if not names else []
+            names = names or close
+            hint = "Такого пакета нет в PyPI" + (f". Возможно: {', '.join(close[:3])}" if close else "")
+        def show():
+            if gen == package_suggest_gen[0]:
+                show_package_suggestions(names)
+                label_package_hint.config(text=hint)
+        root.after(0, show)
+    threading.Thread(target=work, daemon=True).start()
+
+def on_package_key(event):
+    if event.keysym in ("Down",) and package_suggest_box.winfo_ismapped():
+        package_suggest_box.focus_set()
+        package_suggest_box.selection_clear(0, 'end')
+        package_suggest_box.selection_set(0)
+        package_suggest_box.activate(0)
+        return
+    if event.keysym in ("Escape", "Return"):
+        hide_package_suggestions()
+        return
+    if package_suggest_job[0]:
+        root.after_cancel(package_suggest_job[0])
+    package_suggest_job[0] = root.after(80, update_package_suggestions)
+
+def pick_package_suggestion(event=None):
+    sel = package_suggest_box.curselection()
+    if not sel:
+        return
+    entry_package.delete(0, 'end')
+    entry_package.insert(0, package_suggest_box.get(sel[0]))
+    hide_package_suggestions()
+    label_package_hint.config(text="")
+    entry_version.focus_set()
+    load_package_versions()
+
+def load_package_versions(event=None):
+    name = entry_package.get().strip()
+    if not name or not HAS_REQUESTS or canonical_name(name) == package_versions_for[0]:
+        return
+    package_versions_for[0] = canonical_name(name)
+    entry_version.config(values=())
+    def work():
+        try:
+            versions = sorted(pypi_versions(name), key=version_sort_key, reverse=True)
+        except Exception:
+            versions = []
+        def show():
+            if package_versions_for[0] == canonical_name(name):
+                entry_version.config(values=versions)
+        root.after(0, show)
+    threading.Thread(target=work, daemon=True).start()
+
+entry_package.bind("<KeyRelease>", on_package_key)
+entry_package.bind("<FocusOut>", load_package_versions)
+entry_package.bind("<FocusIn>", lambda e: start_pypi_names_load())
+package_suggest_box.bind("<Return>", pick_package_suggestion)
+package_suggest_box.bind("<Double-1>", pick_package_suggestion)
+package_suggest_box.bind("<Escape>", lambda e: (hide_package_suggestions(), entry_package.focus_set()))
+entry_version.bind("<Button-1>", load_package_versions)
+
 label_status = tk.Label(frame_install, text="", font=("Arial", 12))
 label_status.pack(pady=5)
 progress_bar = ttk.Progressbar(frame_install, mode='indeterminate')
@@ -868,59 +4185,369 @@ def install_package():
     progress_bar.start(10)
     def run():
         try:
-            result = subprocess.run([python_path, '-m', 'pip', 'install', full],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            msg = f"Установлено: {full}" if result.returncode == 0 else result.stderr
+            code, output = pip_install(python_path, [full])
+            msg = f"Установлено: {full}" if code == 0 else "\n".join(output.strip().splitlines()[-5:])
         except Exception as e:
             msg = str(e)
         def update():
             progress_bar.stop()
             progress_bar.pack_forget()
             label_status.config(text=msg)
+            update_wheelhouse_label()
         root.after(0, update)
     threading.Thread(target=run).start()
 
 btn_install = tk.Button(frame_install, text="Установить", command=install_package)
 btn_install.pack(pady=10)
 
-# ... (остальные вкладки, функции, переключатели - без изменений) ...
+frame_wheelhouse = tk.LabelFrame(frame_install, text="Локальный склад колёс")
+frame_wheelhouse.pack(pady=10, padx=10, fill='x')
+label_wheelhouse = tk.Label(frame_wheelhouse, text="", anchor='w')
+label_wheelhouse.pack(fill='x', padx=5)
+wheelhouse_use_var = tk.BooleanVar(value=config.get(WHEELHOUSE_USE_KEY, False))
+wheelhouse_offline_var = tk.BooleanVar(value=config.get(WHEELHOUSE_OFFLINE_KEY, False))
 
-btn_install_mode.config(command=show_install_mode)
-btn_all_mode.config(command=show_all_mode)
-btn_transform_mode.config(command=show_transform_mode)
-btn_editor_mode.config(command=show_editor_mode)
-btn_help.config(command=show_help_mode)
-update_github_auth_button()
+def update_wheelhouse_label():
+    size, count = wheelhouse_size()
+    limit = int(config.get(WHEELHOUSE_LIMIT_KEY, WHEELHOUSE_DEFAULT_LIMIT_MB))
+    label_wheelhouse.config(text=f"{wheelhouse_dir()}: {count} файлов, {format_size(size)} из {limit} МБ")
+
+def toggle_wheelhouse():
+    config[WHEELHOUSE_USE_KEY] = wheelhouse_use_var.get()
+    config[WHEELHOUSE_OFFLINE_KEY] = wheelhouse_offline_var.get()
+    save_config(config)
+
+def wheelhouse_set_limit():
+    limit = simpledialog.askinteger("Склад колёс", "Максимальный размер склада, МБ:", parent=root, minvalue=0,
+                                    initialvalue=int(config.get(WHEELHOUSE_LIMIT_KEY, WHEELHOUSE_DEFAULT_LIMIT_MB)))
+    if limit is None:
+        return
+    config[WHEELHOUSE_LIMIT_KEY] = limit
+    save_config(config)
+    removed = wheelhouse_evict()
+    update_wheelhouse_label()
+    if removed:
+        messagebox.showinfo("Склад колёс", f"Удалено давно не использованных файлов: {removed}")
+
+tk.Checkbutton(frame_wheelhouse, text="Ставить через склад", variable=wheelhouse_use_var,
+               command=toggle_wheelhouse).pack(side='left', padx=5)
+tk.Checkbutton(frame_wheelhouse, text="Только склад (без сети)", variable=wheelhouse_offline_var,
+               command=toggle_wheelhouse).pack(side='left', padx=5)
+tk.Button(frame_wheelhouse, text="Лимит и очистка...", command=wheelhouse_set_limit).pack(side='left', padx=5)
+update_wheelhouse_label()
 
 # ========== Список библиотек ==========
 
+# Список — ttk.Treeview: строки не являются виджетами, Tk рисует только видимые,
+# поэтому тысячи пакетов не тормозят. Все пакеты лежат в all_packages (ключ —
+# нормализованное имя); фильтр и сортировка перестраивают только порядок строк,
+# а после установки/удаления меняются лишь затронутые строки.
+
 frame_all = tk.Frame(root)
+frame_all_python = tk.Frame(frame_all)
+frame_all_python.pack(fill='x', pady=2)
+tk.Label(frame_all_python, text="Python:").pack(side='left', padx=3)
+all_python_combo = ttk.Combobox(frame_all_python, width=80, state='readonly')
+all_python_combo.pack(side='left')
 frame_all_buttons = tk.Frame(frame_all)
 frame_all_buttons.pack(fill='x', pady=2)
-canvas_all = tk.Canvas(frame_all)
-scrollbar_all = ttk.Scrollbar(frame_all, orient="vertical", command=canvas_all.yview)
-scrollable_all = tk.Frame(canvas_all)
-scrollable_all.bind("<Configure>", lambda e: canvas_all.configure(scrollregion=canvas_all.bbox("all")))
-canvas_all.create_window((0,0), window=scrollable_all, anchor="nw")
-canvas_all.configure(yscrollcommand=scrollbar_all.set)
-canvas_all.pack(side="left", fill="both", expand=True)
-scrollbar_all.pack(side="right", fill="y")
-
-def clear_frame(frame):
-    for widget in frame.winfo_children():
-        widget.destroy()
+tk.Label(frame_all_buttons, text="Фильтр:").pack(side='left', padx=3)
+all_filter_entry = tk.Entry(frame_all_buttons, width=30)
+all_filter_entry.pack(side='left')
+all_count_label = tk.Label(frame_all_buttons, text="")
+all_count_label.pack(side='left', padx=5)
+frame_all_actions = tk.Frame(frame_all)
+frame_all_actions.pack(fill='x', pady=2)
+all_status = tk.Label(frame_all, text="", anchor='w', justify='left')
+all_status.pack(fill='x', padx=5)
+all_progress = ttk.Progressbar(frame_all, mode='indeterminate')
+frame_all_tree = tk.Frame(frame_all)
+frame_all_tree.pack(fill='both', expand=True)
+
+ALL_COLUMNS = (("name", "Пакет", 300), ("version", "Версия", 150),
+               ("import_self", "Импорт: свой, мс", 130), ("import_total", "Импорт: всего, мс", 130))
+
+all_tree = ttk.Treeview(frame_all_tree, columns=[c[0] for c in ALL_COLUMNS], show="headings", selectmode="extended")
+all_tree_scroll = ttk.Scrollbar(frame_all_tree, orient="vertical", command=all_tree.yview)
+all_tree.configure(yscrollcommand=all_tree_scroll.set)
+all_tree.pack(side="left", fill="both", expand=True)
+all_tree_scroll.pack(side="right", fill="y")
+
+all_packages = {}
+all_view = {"sort": "name", "reverse": False, "visible": []}
+all_filter_job = [None]
+all_reload_gen = [0]
+all_import_times = {}
+
+def all_key(pkg):
+    return pkg.get("key") or canonical_name(pkg["name"])
+
+def all_import_value(pkg, field):
+    value = all_import_times.get(all_key(pkg), {}).get(field)
+    return -1 if value is None else value
+
+ALL_SORT_KEYS = {
+    "name": lambda pkg: pkg["name"].lower(),
+    "version": lambda pkg: version_sort_key(pkg["version"]),
+    "import_self": lambda pkg: all_import_value(pkg, "self_ms"),
+    "import_total": lambda pkg: all_import_value(pkg, "total_ms"),
+}
+
+def all_row_values(pkg):
+    timing = all_import_times.get(all_key(pkg))
+    if not timing:
+        return (pkg["name"], pkg["version"], "", "")
+    if timing["total_ms"] is None or len(timing["failed"]) == len(timing["modules"]):
+        return (pkg["name"], pkg["version"], "ошибка", "ошибка")
+    return (pkg["name"], pkg["version"], f"{timing['self_ms']:.1f}", f"{timing['total_ms']:.1f}")
+
+def all_refresh_view():
+    needle = all_filter_entry.get().strip().lower()
+    matching = [k for k, pkg in all_packages.items() if needle in pkg["name"].lower() or needle in k]
+    matching.sort(key=lambda k: ALL_SORT_KEYS[all_view["sort"]](all_packages[k]), reverse=all_view["reverse"])
+    if matching != all_view["visible"]:
+        all_tree.detach(*all_tree.get_children())
+        for i, key in enumerate(matching):
+            all_tree.move(key, "", i)
+        all_view["visible"] = matching
+    all_count_label.config(text=f"Показано {len(matching)} из {len(all_packages)}")
+
+def all_sort_by(column):
+    if all_view["sort"] == column:
+        all_view["reverse"] = not all_view["reverse"]
+    else:
+        all_view["sort"], all_view["reverse"] = column, False
+    for col, title, _ in ALL_COLUMNS:
+        arrow = (" ▼" if all_view["reverse"] else " ▲") if col == column else ""
+        all_tree.heading(col, text=title + arrow)
+    all_refresh_view()
+
+for col, title, width in ALL_COLUMNS:
+    all_tree.heading(col, text=title, command=lambda c=col: all_sort_by(c))
+    all_tree.column(col, width=width, anchor='w')
+
+def all_on_filter(event=None):
+    if all_filter_job[0]:
+        root.after_cancel(all_filter_job[0])
+    all_filter_job[0] = root.after(60, all_refresh_view)
+
+all_filter_entry.bind("<KeyRelease>", all_on_filter)
+
+def all_apply_packages(packages):
+    fresh = {all_key(pkg): pkg for pkg in packages}
+    for key in list(all_packages):
+        if key not in fresh:
+            all_tree.delete(key)
+            del all_packages[key]
+    for key, pkg in fresh.items():
+        if key not in all_packages:
+            all_tree.insert("", "end", iid=key, values=all_row_values(pkg))
+        elif all_row_values(all_packages[key]) != all_row_values(pkg):
+            all_tree.item(key, values=all_row_values(pkg))
+        all_packages[key] = pkg
+    all_view["visible"] = None
+    all_refresh_view()
+    if not all_packages:
+        all_status.config(text="Пакеты не найдены")
+
+def all_set_busy(text):
+    all_status.config(text=text)
+    all_progress.pack(before=frame_all_tree, pady=5)
+    all_progress.start(10)
+
+def all_set_idle(text=None):
+    all_progress.stop()
+    all_progress.pack_forget()
+    if text is not None:
+        all_status.config(text=text)
+
+def all_reload():
+    if not all_packages:
+        all_set_busy("Загрузка списка пакетов...")
+    all_reload_gen[0] += 1
+    gen = all_reload_gen[0]
+    python = get_default_python()
+    def load():
+        packages = fetch_installed_packages(python)
+        try:
+            timings = load_import_times(python)
+        except Exception:
+            timings = {}
+        try:
+            get_dependency_graph(python)  # граф нужен для удаления — строим его заранее, не в потоке Tk
+        except Exception:
+            pass
+        def draw():
+            # Пока грузили, могли переключить интерпретатор — старый ответ не нужен
+            if gen != all_reload_gen[0]:
+                return
+            all_set_idle()
+            all_import_times.clear()
+            all_import_times.update(timings)
+            all_apply_packages(packages)
+        root.after(0, draw)
+    threading.Thread(target=load).start()
+
+def all_selected_names():
+    return [all_packages[k]["name"] for k in all_tree.selection() if k in all_packages]
+
+def all_run_pip(args, busy_text):
+    all_set_busy(busy_text)
+    def run():
+        try:
+            if args[0] == 'install':
+                code, output = pip_install(get_default_python(), args[1:])
+            else:
+                code, output = run_pip(get_default_python(), args)
+            msg = output.strip()
+        except Exception as e:
+            msg = str(e)
+        def update():
+            all_set_idle("\n".join(msg.splitlines()[-3:]))
+            all_reload()
+        root.after(0, update)
+    threading.Thread(target=run).start()
+
+def all_uninstall_selected():
+    names = all_selected_names()
+    if not names:
+        return
+    python = get_default_python()
+    all_set_busy("Проверка зависимостей...")
+    def check():
+        try:
+            graph = get_dependency_graph(python)
+            dependents = sorted(graph["packages"][k]["name"] for k in
+                                installed_dependents(graph, [canonical_name(n) for n in names]))
+        except Exception:
+            dependents = []
+        root.after(0, lambda: confirm(dependents))
+    def confirm(dependents):
+        all_set_idle("")
+        question = f"Удалить {', '.join(names)}?"
+        if dependents:
+            question += f"\n\nОт них зависят ({len(dependents)}): {', '.join(dependents)}.\nЭти пакеты могут перестать работать."
+        if not (messagebox.askokcancel if dependents else messagebox.askyesno)("Подтверждение", question, icon='warning' if dependents else 'question'):
+            return
+        all_run_pip(['uninstall', '-y'] + names, f"Удаление {', '.join(names)}...")
+    threading.Thread(target=check, daemon=True).start()
+
+def all_remove_orphans():
+    python = get_default_python()
+    all_set_busy("Поиск ненужных зависимостей...")
+    def check():
+        try:
+            graph = get_dependency_graph(python)
+            names, error = sorted((graph["packages"][k]["name"] for k in find_orphans(graph)), key=str.lower), None
+        except Exception as e:
+            names, error = [], str(e)
+        root.after(0, lambda: confirm(names, error))
+    def confirm(names, error):
+        all_set_idle("")
+        if error:
+            messagebox.showerror("Ошибка", f"Ошибка: {error}")
+            return
+        if not names:
+            messagebox.showinfo("Ненужные зависимости", "Ненужных зависимостей нет.")
+            return
+        if not messagebox.askyesno("Ненужные зависимости",
+                                   f"Эти пакеты были установлены как зависимости и больше никому не нужны:\n\n"
+                                   f"{', '.join(names)}\n\nУдалить их ({len(names)})?"):
+            return
+        all_run_pip(['uninstall', '-y'] + names, f"Удаление {len(names)} ненужных зависимостей...")
+    threading.Thread(target=check, daemon=True).start()
+
+def all_upgrade_selected():
+    names = all_selected_names()
+    if names:
+        all_run_pip(['install', '--upgrade'] + names, f"Обновление {', '.join(names)}...")
+
+def details_text(details):
+    lines = [f"{details['name']} {details['version']}", ""]
+    lines += [f"{title}: {value}" for title, value in details["fields"]]
+    lines.append(f"Расположение: {details['location']}")
+    lines.append(f"Размер на диске: {format_size(details['size'])}")
+    lines.append("")
+    lines.append("Зависит от: " + (", ".join(details["requires"]) or "—"))
+    if details["extras"]:
+        lines.append("Необязательные (extras): " + ", ".join(details["extras"]))
+    lines.append("Нужен для: " + (", ".join(details["required_by"]) or "—"))
+    return "\n".join(lines)
+
+def show_details(key):
+    # Окно открывается сразу, метаданные читаются в фоне; повторное открытие берёт кэш
+    pkg = all_packages.get(key)
+    win = tk.Toplevel(root)
+    win.title(f"Информация о {pkg['name'] if pkg else key}")
+    txt = tk.Text(win, wrap='word', width=80, height=20)
+    txt.insert('1.0', "Загрузка...")
+    txt.pack(expand=True, fill='both')
+    def load():
+        try:
+            text = details_text(package_details(key))
+        except Exception as e:
+            text = f"Ошибка: {e}"
+        def show():
+            if txt.winfo_exists():
+                txt.delete('1.0', 'end')
+                txt.insert('1.0', text)
+        root.after(0, show)
+    threading.Thread(target=load, daemon=True).start()
+
+def all_profile_imports():
+    keys = [k for k in all_tree.selection() if k in all_packages]
+    if not keys:
+        keys = list(all_packages)
+        if not messagebox.askyesno("Профиль импорта",
+                                   f"Ничего не выбрано. Замерить время импорта всех {len(keys)} пакетов?\n"
+                                   f"Уже замеренные версии возьмутся из кэша."):
+            return
+    python = get_default_python()
+    gen = all_reload_gen[0]
+    done = [0]
+    all_set_busy(f"Замер времени импорта: 0/{len(keys)}")
+    def on_result(key, timing):
+        def update():
+            if gen != all_reload_gen[0]:
+                return
+            done[0] += 1
+            all_import_times[key] = timing
+            if key in all_packages and all_tree.exists(key):
+                all_tree.item(key, values=all_row_values(all_packages[key]))
+            all_status.config(text=f"Замер времени импорта: {done[0]}/{len(keys)}")
+        root.after(0, update)
+    def run():
+        try:
+            profile_imports(keys, python, on_result)
+            msg = f"Время импорта замерено для {len(keys)} пакетов (сортировка — по заголовку столбца)"
+        except Exception as e:
+            msg = f"Ошибка: {e}"
+        def finish():
+            all_set_idle(msg)
+            if all_view["sort"].startswith("import"):
+                all_view["visible"] = None
+                all_refresh_view()
+        root.after(0, finish)
+    threading.Thread(target=run, daemon=True).start()
+
+def all_details_selected(event=None):
+    keys = [k for k in all_tree.selection() if k in all_packages]
+    if keys:
+        show_details(keys[0])
+
+tk.Button(frame_all_actions, text="Удалить", command=all_uninstall_selected).pack(side='left', padx=5)
+tk.Button(frame_all_actions, text="Обновить", command=all_upgrade_selected).pack(side='left', padx=5)
+tk.Button(frame_all_actions, text="Подробнее", command=all_details_selected).pack(side='left', padx=5)
+tk.Button(frame_all_actions, text="Профиль импорта", command=all_profile_imports).pack(side='left', padx=5)
+all_tree.bind("<Double-1>", all_details_selected)
 
 def get_installed_packages():
-    try:
-        out = subprocess.check_output([get_default_python(), "-m", "pip", "freeze"], text=True)
-        return {line.strip().split("==")[0].lower() for line in out.splitlines() if "==" in line}
-    except Exception:
-        return set()
+    return {pkg['name'].lower() for pkg in fetch_installed_packages()}
 
-def fetch_installed_packages():
+def fetch_installed_packages_pip(python=None):
     try:
         result = subprocess.run(
-            [get_default_python(), '-m', 'pip', 'list', '--format=json'],
+            [python or get_default_python(), '-m', 'pip', 'list', '--format=json'],
             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         )
         if result.returncode == 0:
@@ -929,33 +4556,334 @@ def fetch_installed_packages():
         pass
     return []
 
+def fetch_installed_packages(python=None):
+    try:
+        return get_inventory(python)["packages"]
+    except Exception:
+        # Очень старый Python без importlib.metadata — спрашиваем pip
+        return fetch_installed_packages_pip(python)
+
+# «Обновить все»: сначала по кэшу индекса PyPI выясняем, что реально устарело,
+# потом обновляем это одним вызовом pip (один прогон резолвера вместо сотни).
+# pip обновляется отдельно и первым — заменять себя посреди общей установки он не любит.
+
+UPGRADE_COLLECTING_RE = re.compile(r"^Collecting ([A-Za-z0-9._-]+)")
+UPGRADE_INSTALLED_RE = re.compile(r"^Successfully installed (.+)$")
+
 def upgrade_all_packages():
-    pkgs = get_installed_packages()
-    if not pkgs:
-        messagebox.showinfo("Обновление", "Нет установленных библиотек.")
-        return
-    answer = messagebox.askyesno("Обновление", f"Обновить {len(pkgs)} библиотек? Это может занять много времени.")
-    if not answer:
+    if not HAS_REQUESTS:
+        ask_install_requests()
         return
+    python = get_default_python()
     win = tk.Toplevel(root)
     win.title("Обновление библиотек")
-    txt = tk.Text(win, width=80, height=24)
-    txt.pack(expand=True, fill='both')
-    txt.insert('end', "Обновление...\n")
-    txt.see('end')
+    status = tk.Label(win, text="Проверка обновлений...", anchor='w')
+    status.pack(fill='x', padx=5, pady=3)
+    bar = ttk.Progressbar(win, mode='determinate')
+    bar.pack(fill='x', padx=5)
+    tree = ttk.Treeview(win, columns=("name", "installed", "latest", "state"), show="headings", height=10)
+    for col, title, width in (("name", "Пакет", 220), ("installed", "Установлена", 110),
+                              ("latest", "Доступна", 110), ("state", "Статус", 140)):
+        tree.heading(col, text=title)
+        tree.column(col, width=width, anchor='w')
+    tree.pack(fill='both', expand=True, padx=5, pady=3)
+    txt = tk.Text(win, width=80, height=10)
+    txt.pack(fill='both', expand=True, padx=5, pady=3)
+
+    def ui(fn, *args):
+        root.after(0, lambda: fn(*args) if win.winfo_exists() else None)
+
+    def log(line):
+        txt.insert('end', line)
+        txt.see('end')
+
+    def set_state(key, text):
+        if tree.exists(key):
+            tree.set(key, "state", text)
+
+    def on_check(done, total):
+        bar.config(maximum=total, value=done)
+        status.config(text=f"Проверка обновлений {done}/{total}")
+
+    def show_outdated(outdated):
+        bar.config(mode='indeterminate')
+        bar.start(10)
+        for pkg, latest in outdated:
+            tree.insert("", "end", iid=canonical_name(pkg["name"]),
+                        values=(pkg["name"], pkg["version"], latest, "ожидает"))
+
+    def pip_stream(args, keys):
+        installed = set()
+        def on_line(line):
+            ui(log, line)
+            m = UPGRADE_COLLECTING_RE.match(line)
+            if m and canonical_name(m.group(1)) in keys:
+                ui(set_state, canonical_name(m.group(1)), "загрузка")
+            elif line.startswith("Installing collected packages:"):
+                for key in keys:
+                    ui(set_state, key, "установка")
+            m = UPGRADE_INSTALLED_RE.match(line.strip())
+            if m:
+                installed.update(canonical_name(n.rsplit("-", 1)[0]) for n in m.group(1).split())
+        code, _ = pip_install(python, args[1:], on_line)
+        return code, installed
+
     def worker():
-        for pkg in pkgs:
-            txt.insert('end', f"\nОбновление {pkg}...\n")
-            txt.see('end')
-            proc = subprocess.run([get_default_python(), "-m", "pip", "install", "--upgrade", pkg],
-                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            txt.insert('end', proc.stdout)
-            txt.see('end')
-        txt.insert('end', "\nГотово!\n")
+        started = time.perf_counter()
+        try:
+            packages = fetch_installed_packages()
+            outdated = find_outdated(packages, lambda d, t: ui(on_check, d, t))
+        except Exception as e:
+            ui(status.config, {"text": f"Ошибка: {e}"})
+            return
+        ui(show_outdated, outdated)
+        if not outdated:
+            ui(status.config, {"text": f"Все {len(packages)} библиотек актуальны"})
+            return
+        keys = {canonical_name(pkg["name"]) for pkg, _ in outdated}
+        upgraded = set()
+        try:
+            if "pip" in keys:
+                ui(status.config, {"text": "Обновление pip..."})
+                code, done = pip_stream(['install', '--upgrade', 'pip'], {"pip"})
+                upgraded |= done
+                keys.discard("pip")
+            names = [pkg["name"] for pkg, _ in outdated if canonical_name(pkg["name"]) in keys]
+            if names:
+                ui(status.config, {"text": f"Обновление {len(names)} библиотек одним вызовом pip..."})
+                code, done = pip_stream(['install', '--upgrade'] + names, keys)
+                upgraded |= done
+                if code != 0:
+                    # Резолвер не смог обновить всё разом — обновляем по одной только устаревшие
+                    for name in names:
+                        key = canonical_name(name)
+                        if key in upgraded:
+                            continue
+                        ui(set_state, key, "отдельно...")
+                        code, done = pip_stream(['install', '--upgrade', name], {key})
+                        upgraded |= done
+        except Exception as e:
+            ui(log, f"\nОшибка: {e}\n")
+        def finish():
+            for pkg, _ in outdated:
+                key = canonical_name(pkg["name"])
+                set_state(key, "обновлён" if key in upgraded else "не обновлён")
+            bar.stop()
+            bar.config(mode='determinate', value=bar["maximum"])
+            status.config(text=f"Обновлено {len(upgraded & {canonical_name(p['name']) for p, _ in outdated})} "
+                               f"из {len(outdated)} за {time.perf_counter() - started:.1f} с")
+            all_reload()
+        ui(finish)
+    threading.Thread(target=worker, daemon=True).start()
+
+def export_environment():
+    if not HAS_REQUESTS:
+        ask_install_requests()
+        return
+    path = filedialog.asksaveasfilename(title="Экспорт окружения", defaultextension=".txt",
+                                        initialfile="requirements.lock.txt",
+                                        filetypes=[("Lock-файл", "*.txt"), ("Все файлы", "*.*")])
+    if not path:
+        return
+    all_set_busy("Экспорт окружения: получение хэшей...")
+    def run():
+        try:
+            count, missing = export_lock(path, progress=lambda d, t: root.after(
+                0, lambda: all_status.config(text=f"Экспорт окружения: хэши {d}/{t}")))
+            msg = f"Сохранено {count} пакетов в {path}"
+            if missing:
+                msg += f"\nБез хэшей (нет в индексе), пропущены: {', '.join(missing)}"
+        except Exception as e:
+            msg = f"Ошибка: {e}"
+        root.after(0, lambda: all_set_idle(msg))
+    threading.Thread(target=run, daemon=True).start()
+
+def restore_environment():
+    path = filedialog.askopenfilename(title="Восстановить окружение",
+                                      filetypes=[("Lock-файл", "*.txt"), ("Все файлы", "*.*")])
+    if not path:
+        return
+    python = get_default_python()
+    try:
+        entries = parse_lock(path)
+        install, same, extra = diff_lock(entries, get_inventory(python))
+    except Exception as e:
+        messagebox.showerror("Ошибка", f"Ошибка: {e}")
+        return
+    if not install:
+        messagebox.showinfo("Восстановление", f"Все {len(same)} пакетов из файла уже установлены в нужных версиях.")
+        return
+    question = (f"Поставить или сменить версию: {len(install)}\nУже совпадает: {len(same)}\n"
+                f"Есть только в окружении (не трогаем): {len(extra)}\n\n"
+                + ", ".join(f"{e['name']}=={e['version']}" for e in install[:30])
+                + (" ..." if len(install) > 30 else "") + "\n\nПродолжить?")
+    if not messagebox.askyesno("Восстановление окружения", question):
+        return
+    win = tk.Toplevel(root)
+    win.title("Восстановление окружения")
+    status = tk.Label(win, text="", anchor='w', justify='left')
+    status.pack(fill='x', padx=5, pady=3)
+    bar = ttk.Progressbar(win, mode='determinate', maximum=len(install))
+    bar.pack(fill='x', padx=5)
+    txt = tk.Text(win, width=90, height=20)
+    txt.pack(fill='both', expand=True, padx=5, pady=3)
+
+    def ui(fn, *args):
+        root.after(0, lambda: fn(*args) if win.winfo_exists() else None)
+
+    def log(line):
+        txt.insert('end', line)
         txt.see('end')
-    threading.Thread(target=worker).start()
+
+    def on_download(done, total):
+        bar.config(value=done)
+        status.config(text=f"Скачивание на склад: {done}/{total} (потоков: {LOCK_DOWNLOAD_WORKERS})")
+
+    def worker():
+        started = time.perf_counter()
+        try:
+            wall, serial, failed = (0.0, 0.0, [])
+            if not config.get(WHEELHOUSE_OFFLINE_KEY):
+                wall, serial, failed = prefetch_lock(python, install, lambda d, t: ui(on_download, d, t))
+                if failed:
+                    ui(log, f"Не удалось заранее скачать: {', '.join(failed)}\n")
+            ui(status.config, {"text": f"Установка {len(install)} пакетов одним вызовом pip..."})
+            t = time.perf_counter()
+            code, _ = restore_lock(python, install, lambda line: ui(log, line))
+            install_time = time.perf_counter() - t
+        except Exception as e:
+            ui(status.config, {"text": f"Ошибка: {e}"})
+            return
+        total = time.perf_counter() - started
+        if code != 0:
+            ui(status.config, {"text": f"pip завершился с ошибкой (код {code}), подробности в журнале"})
+            ui(all_reload)
+            return
+        # Оценка полной переустановки: то же среднее время на пакет для всех пакетов файла
+        per_package = (serial + install_time) / len(install)
+        full = per_package * len(entries)
+        report = (f"Готово за {total:.1f} с: поставлено {len(install)}, пропущено совпадающих {len(same)}.\n"
+                  f"Полная переустановка всех {len(entries)} пакетов заняла бы ≈ {full:.1f} с "
+                  f"(экономия ≈ {max(full - total, 0):.1f} с); параллельное скачивание: "
+                  f"{wall:.1f} с вместо {serial:.1f} с.")
+        ui(status.config, {"text": report})
+        ui(update_wheelhouse_label)
+        ui(all_reload)
+    threading.Thread(target=worker, daemon=True).start()
 
 tk.Button(frame_all_buttons, text="Обновить все библиотеки", command=upgrade_all_packages).pack(side='left', padx=3)
+tk.Button(frame_all_buttons, text="Экспорт окружения", command=export_environment).pack(side='left', padx=3)
+tk.Button(frame_all_buttons, text="Восстановить окружение", command=restore_environment).pack(side='left', padx=3)
+tk.Button(frame_all_buttons, text="Удалить ненужные зависимости", command=all_remove_orphans).pack(side='left', padx=3)
+
+# ----- Выбор и сравнение интерпретаторов -----
+
+interpreters = [load_interpreters()]
+interpreters_discovering = [False]
+
+def refresh_python_choices():
+    items = interpreters[0]
+    labels = [interpreter_label(i) for i in items]
+    all_python_combo.config(values=labels)
+    entry_python.config(values=[i["path"] for i in items])
+    current = python_key(get_default_python())
+    for label, info in zip(labels, items):
+        if python_key(info["path"]) == current:
+            all_python_combo.set(label)
+            break
+    else:
+        all_python_combo.set(get_default_python())
+
+def discover_pythons(force=False):
+    if interpreters_discovering[0] or (interpreters[0] and not force):
+        return
+    interpreters_discovering[0] = True
+    all_status.config(text="Поиск интерпретаторов Python...")
+    def run():
+        found = discover_interpreters()
+        def done():
+            interpreters_discovering[0] = False
+            interpreters[0] = found
+            refresh_python_choices()
+            all_status.config(text=f"Найдено интерпретаторов Python: {len(found)}")
+        root.after(0, done)
+    threading.Thread(target=run, daemon=True).start()
+
+def select_python(python):
+    if python_key(python) == python_key(get_default_python()):
+        return
+    config["python_path"] = python
+    save_config(config)
+    entry_python.delete(0, 'end')
+    entry_python.insert(0, python)
+    all_reload()
+
+def on_python_combo(event=None):
+    idx = all_python_combo.current()
+    if 0 <= idx < len(interpreters[0]):
+        select_python(interpreters[0][idx]["path"])
+
+def compare_environments():
+    items = interpreters[0]
+    if len(items) < 2:
+        messagebox.showinfo("Сравнение окружений", "Нужно хотя бы два найденных интерпретатора Python.")
+        discover_pythons(force=True)
+        return
+    win = tk.Toplevel(root)
+    win.title("Сравнение окружений")
+    top = tk.Frame(win)
+    top.pack(fill='x')
+    status = tk.Label(top, text="Загрузка инвентарей...", anchor='w')
+    status.pack(side='left', padx=5)
+    only_diff = tk.BooleanVar(value=True)
+    frame = tk.Frame(win)
+    frame.pack(fill='both', expand=True)
+    columns = ["name"] + [f"py{i}" for i in range(len(items))]
+    tree = ttk.Treeview(frame, columns=columns, show="headings")
+    xscroll = ttk.Scrollbar(frame, orient="horizontal", command=tree.xview)
+    yscroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+    tree.configure(xscrollcommand=xscroll.set, yscrollcommand=yscroll.set)
+    yscroll.pack(side='right', fill='y')
+    xscroll.pack(side='bottom', fill='x')
+    tree.pack(side='left', fill='both', expand=True)
+    tree.heading("name", text="Пакет")
+    tree.column("name", width=200, anchor='w', stretch=False)
+    for i, info in enumerate(items):
+        title = info["version"] + (f" ({os.path.basename(info['prefix'].rstrip('/'))})" if info["venv"] else "")
+        tree.heading(f"py{i}", text=title)
+        tree.column(f"py{i}", width=110, anchor='w', stretch=False)
+    tree.tag_configure("diff", background="#fff2cc")
+    table = {}
+
+    def fill():
+        tree.delete(*tree.get_children())
+        for key in sorted(table):
+            row = table[key]
+            differs = len(set(row["versions"])) > 1
+            if only_diff.get() and not differs:
+                continue
+            tree.insert("", "end", values=[row["name"]] + [v or "—" for v in row["versions"]],
+                        tags=("diff",) if differs else ())
+
+    tk.Checkbutton(top, text="Только различия", variable=only_diff, command=fill).pack(side='right', padx=5)
+
+    def load():
+        result, failed = compare_inventories([i["path"] for i in items])
+        def show():
+            if not win.winfo_exists():
+                return
+            table.update(result)
+            fill()
+            text = f"Пакетов: {len(table)}, окружений: {len(items)}"
+            if failed:
+                text += f"; недоступны: {', '.join(failed)}"
+            status.config(text=text)
+        root.after(0, show)
+    threading.Thread(target=load, daemon=True).start()
+
+all_python_combo.bind("<<ComboboxSelected>>", on_python_combo)
+tk.Button(frame_all_python, text="Найти Python", command=lambda: discover_pythons(force=True)).pack(side='left', padx=3)
+tk.Button(frame_all_python, text="Сравнить окружения", command=compare_environments).pack(side='left', padx=3)
 
 def show_all_mode():
     frame_install.pack_forget()
@@ -968,63 +4896,9 @@ def show_all_mode():
     btn_transform_mode.config(relief='raised')
     btn_editor_mode.config(relief='raised')
     btn_help.config(relief='raised')
-    clear_frame(scrollable_all)
-    progress_bar.pack(pady=5)
-    progress_bar.start(10)
-    def load():
-        packages = fetch_installed_packages()
-        def draw():
-            progress_bar.stop()
-            progress_bar.pack_forget()
-            if not packages:
-                tk.Label(scrollable_all, text="Пакеты не найдены", font=("Arial", 14)).pack(pady=30)
-            for pkg in packages:
-                f = tk.Frame(scrollable_all, pady=7, bd=1, relief='solid')
-                f.pack(fill='x', padx=5)
-                tk.Label(f, text=pkg['name'], font=("Arial", 14, "bold")).pack(anchor='w')
-                tk.Label(f, text=f"Версия: {pkg['version']}", font=("Arial", 10)).pack(anchor='w')
-                btns = tk.Frame(f)
-                btns.pack(anchor='w', pady=5)
-                def uninstall(name=pkg['name']):
-                    answer = messagebox.askyesno("Подтверждение", f"Удалить {name}?")
-                    if not answer:
-                        return
-                    label_status.config(text=f"Удаление {name}...")
-                    progress_bar.pack(pady=5)
-                    progress_bar.start(10)
-                    def run():
-                        result = subprocess.run([get_default_python(), '-m', 'pip', 'uninstall', '-y', name],
-                                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                        msg = result.stdout + '\n' + result.stderr
-                        def update():
-                            progress_bar.stop()
-                            progress_bar.pack_forget()
-                            label_status.config(text=msg)
-                            show_all_mode()
-                        root.after(0, update)
-                    threading.Thread(target=run).start()
-                def upgrade(name=pkg['name']):
-                    label_status.config(text=f"Обновление {name}...")
-                    progress_bar.pack(pady=5)
-                    progress_bar.start(10)
-                    def run():
-                        subprocess.run([get_default_python(), '-m', 'pip', 'install', '--upgrade', name])
-                        root.after(0, show_all_mode)
-                    threading.Thread(target=run).start()
-                def show_details(name=pkg['name']):
-                    result = subprocess.run([get_default_python(), '-m', 'pip', 'show', name],
-                                            stdout=subprocess.PIPE, text=True)
-                    win = tk.Toplevel(root)
-                    win.title(f"Информация о {name}")
-                    txt = tk.Text(win, wrap='word')
-                    txt.insert('1.0', result.stdout)
-                    txt.config(state='normal')
-                    txt.pack(expand=True, fill='both')
-                tk.Button(btns, text="Удалить", command=uninstall).pack(side='left', padx=5)
-                tk.Button(btns, text="Обновить", command=upgrade).pack(side='left', padx=5)
-                tk.Button(btns, text="Подробнее", command=show_details).pack(side='left', padx=5)
-        root.after(0, draw)
-    threading.Thread(target=load).start()
+    refresh_python_choices()
+    discover_pythons()
+    all_reload()
 
 # ========== Трансформация .py → .exe ==========
 
@@ -1081,16 +4955,51 @@ tk.Button(frame_transform, text="Выбрать иконку", command=transform
 
 transform_onefile_var = tk.BooleanVar(value=True)
 tk.Checkbutton(frame_transform, text="Собирать в один файл (onefile)", variable=transform_onefile_var).pack(pady=5)
+transform_shared_var = tk.BooleanVar(value=False)
+tk.Checkbutton(frame_transform, text="Общий анализ для всех скриптов (в onedir — одна папка shared)",
+               variable=transform_shared_var).pack(pady=2)
+transform_force_var = tk.BooleanVar(value=False)
+tk.Checkbutton(frame_transform, text="Пересобрать всё (не использовать кэш сборки)",
+               variable=transform_force_var).pack(pady=2)
 
 transform_status = tk.Label(frame_transform, text="", font=("Arial", 12))
 transform_status.pack(pady=5)
 
+TRANSFORM_COLUMNS = (("file", "Файл", 220), ("status", "Статус", 120), ("time", "Время, с", 80),
+                     ("result", "Результат", 420))
+
+frame_transform_results = tk.Frame(frame_transform)
+frame_transform_results.pack(fill='both', expand=True, padx=10, pady=5)
+transform_tree = ttk.Treeview(frame_transform_results, columns=[c[0] for c in TRANSFORM_COLUMNS],
+                              show="headings", height=8)
+transform_tree_scroll = ttk.Scrollbar(frame_transform_results, orient="vertical", command=transform_tree.yview)
+transform_tree.configure(yscrollcommand=transform_tree_scroll.set)
+transform_tree.pack(side='left', fill='both', expand=True)
+transform_tree_scroll.pack(side='right', fill='y')
+for col, title, width in TRANSFORM_COLUMNS:
+    transform_tree.heading(col, text=title)
+    transform_tree.column(col, width=width, anchor='w')
+transform_tree.tag_configure("failed", foreground="red")
+transform_logs = {}
+transform_running = [False]
+transform_excludes = {}
+transform_last = {}
+
+def transform_show_log(event=None):
+    sel = transform_tree.selection()
+    if not sel or sel[0] not in transform_logs:
+        return
+    win = tk.Toplevel(root)
+    win.title(f"Журнал сборки {sel[0]}")
+    txt = tk.Text(win, wrap='none', width=120, height=30)
+    txt.insert('1.0', transform_logs[sel[0]])
+    txt.see('end')
+    txt.pack(expand=True, fill='both')
+
+transform_tree.bind("<Double-1>", transform_show_log)
+
 def is_pyinstaller_installed():
-    try:
-        import PyInstaller
-        return True
-    except ImportError:
-        return False
+    return probe_module("PyInstaller")
 
 def transform_do():
     if not transform_selected_files:
@@ -1099,41 +5008,315 @@ def transform_do():
     if not transform_output_dir:
         messagebox.showerror("Ошибка", "Сначала выберите папку для exe")
         return
+    if transform_running[0]:
+        return
+
+    python = get_default_python()
+    out_dir = transform_output_dir
+    onefile = transform_onefile_var.get()
+    icon = transform_icon_path
+    force = transform_force_var.get()
+    targets = build_targets(transform_selected_files)
+    for t in targets:
+        t["excludes"] = sorted(transform_excludes.get(t["script"], ()))
+    shared = transform_shared_var.get() and len(targets) > 1
+    if shared:
+        problem = shared_build_problem(targets)
+        if problem:
+            messagebox.showerror("Ошибка", f"Общую сборку сделать нельзя: {problem}")
+            return
+    jobs = 1 if shared else build_parallelism(len(targets))
+    transform_tree.delete(*transform_tree.get_children())
+    transform_logs.clear()
+    for t in targets:
+        transform_tree.insert("", "end", iid=t["name"], values=(os.path.basename(t["script"]), "в очереди", "", ""))
+    transform_status.config(text=f"Общая сборка {len(targets)} файлов одним анализом" if shared
+                            else f"Сборка {len(targets)} файлов, параллельно: {jobs}")
+    transform_running[0] = True
+    btn_create_exe.config(state="disabled")
+    started = time.perf_counter()
+    starts = {}
+
+    def tick():
+        # Пока идут сборки, раз в секунду обновляем их время
+        if not transform_running[0]:
+            return
+        now = time.perf_counter()
+        for name, t0 in starts.items():
+            if transform_tree.exists(name) and transform_tree.set(name, "status") == "сборка":
+                transform_tree.set(name, "time", f"{now - t0:.0f}")
+        root.after(1000, tick)
 
-    transform_status.config(text="Запуск преобразования...")
+    def on_event(name, kind, res):
+        def update():
+            if kind == "start":
+                starts[name] = time.perf_counter()
+                transform_tree.set(name, "status", "сборка")
+                return
+            transform_logs[name] = res["log"]
+            transform_tree.item(name, tags=() if res["ok"] else ("failed",))
+            if not res["ok"]:
+                status = "ошибка"
+            elif res["cached"]:
+                status = "без изменений"
+            else:
+                status = "готово" if res["clean"] else "готово (кэш анализа)"
+            transform_tree.set(name, "status", status)
+            transform_tree.set(name, "time", f"{res['elapsed']:.1f}")
+            transform_tree.set(name, "result", res["artifact"] if res["ok"]
+                               else (res["log"].strip().splitlines() or [""])[-1])
+        root.after(0, update)
 
     def run():
-        for file in transform_selected_files:
-            base_name = os.path.splitext(os.path.basename(file))[0]
-            python_path = get_default_python()
-            folder = os.path.dirname(file)
-            cmd = [
-                python_path, "-m", "PyInstaller",
-                "--distpath", transform_output_dir,
-                "--workpath", os.path.join(transform_output_dir, "build"),
-                "--specpath", transform_output_dir
-            ]
-            if transform_onefile_var.get():
-                cmd.append("--onefile")
-            if transform_icon_path:
-                cmd += ["--icon", transform_icon_path]
-            cmd.append(file)
-            try:
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=folder)
-                if result.returncode == 0:
-                    msg = f"Готово: {os.path.join(transform_output_dir, base_name)}.exe"
-                else:
-                    msg = f"Ошибка сборки {os.path.basename(file)}:\n{result.stderr}"
-            except Exception as e:
-                msg = f"Ошибка: {str(e)}"
-            transform_status.after(0, lambda m=msg: transform_status.config(text=m))
-    threading.Thread(target=run).start()
+        try:
+            if shared:
+                for t in targets:
+                    on_event(t["name"], "start", None)
+                results = build_shared(python, targets, out_dir, onefile, icon, force)
+                for name, res in results.items():
+                    on_event(name, "done", res)
+            else:
+                results = run_builds(python, targets, out_dir, onefile, icon, on_event, jobs, force)
+            ok = sum(1 for r in results.values() if r["ok"])
+            skipped = sum(1 for r in results.values() if r["cached"])
+            msg = (f"Готово: {ok} из {len(targets)} (без изменений: {skipped}) за {time.perf_counter() - started:.1f} с "
+                   f"(сумма сборок {sum(r['elapsed'] for r in results.values()):.1f} с). "
+                   f"Двойной щелчок по строке — журнал сборки.")
+        except Exception as e:
+            msg = f"Ошибка: {str(e)}"
+            results = {}
+        def finish():
+            transform_running[0] = False
+            btn_create_exe.config(state="normal")
+            transform_status.config(text=msg)
+            transform_last.clear()
+            transform_last.update(python=python, out_dir=out_dir, onefile=onefile, shared=shared,
+                                  targets=targets, results=results)
+        root.after(0, finish)
+    threading.Thread(target=run, daemon=True).start()
+    root.after(1000, tick)
 
 btn_create_exe = tk.Button(frame_transform, text="Создать exe", command=transform_do)
 btn_create_exe.pack(pady=10)
 if not is_pyinstaller_installed():
     btn_create_exe.config(state="disabled")
 
+def path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for folder, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, f))
+            except OSError:
+                pass
+    return total
+
+def transform_size_report():
+    last = transform_last
+    sel = [n for n in transform_tree.selection() if n in last.get("results", {})]
+    names = sel or [n for n, r in last.get("results", {}).items() if r["ok"]]
+    if not names or not last["results"][names[0]]["ok"]:
+        messagebox.showinfo("Анализ размера", "Сначала успешно соберите exe.")
+        return
+    name = names[0]
+    target = next(t for t in last["targets"] if t["name"] == name)
+    res = last["results"][name]
+    work_dir = build_work_dir(last["out_dir"], name, last["shared"])
+    scripts = [t["script"] for t in last["targets"]] if last["shared"] else [target["script"]]
+    artifact = os.path.dirname(res["artifact"]) if not last["onefile"] else res["artifact"]
+    win = tk.Toplevel(root)
+    win.title(f"Размер сборки {name}")
+    status = tk.Label(win, text="Анализ...", anchor='w', justify='left')
+    status.pack(fill='x', padx=5, pady=3)
+    frame = tk.Frame(win)
+    frame.pack(fill='both', expand=True, padx=5)
+    columns = (("name", "Пакет", 240), ("kind", "Вид", 80), ("size", "Размер", 100), ("files", "Файлов", 70),
+               ("note", "Импорт из скрипта", 200))
+    tree = ttk.Treeview(frame, columns=[c[0] for c in columns], show="headings", height=18)
+    scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scroll.set)
+    tree.pack(side='left', fill='both', expand=True)
+    scroll.pack(side='right', fill='y')
+    for col, title, width in columns:
+        tree.heading(col, text=title)
+        tree.column(col, width=width, anchor='w')
+    tree.tag_configure("suggest", background="#ffe0e0")
+    groups = {}
+
+    def rebuild_without():
+        modules = sorted({m for key in tree.selection() if key in groups and groups[key]["kind"] == "пакет"
+                          for m in groups[key]["modules"]})
+        if not modules:
+            messagebox.showinfo("Исключение модулей", "Выберите пакеты, которые нужно исключить.", parent=win)
+            return
+        if not messagebox.askyesno("Исключение модулей",
+                                   f"Пересобрать с --exclude-module {' '.join(modules)}?\n"
+                                   "Если модуль всё же нужен, exe упадёт при его импорте.", parent=win):
+            return
+        for script in scripts:
+            transform_excludes.setdefault(script, set()).update(modules)
+        win.destroy()
+        transform_do()
+
+    def reset_excludes():
+        excluded = sorted({m for script in scripts for m in transform_excludes.get(script, ())})
+        if not excluded:
+            messagebox.showinfo("Исключение модулей", "Исключённых модулей нет.", parent=win)
+            return
+        if not messagebox.askyesno("Исключение модулей",
+                                   f"Вернуть в сборку {', '.join(excluded)} и пересобрать?", parent=win):
+            return
+        for script in scripts:
+            transform_excludes.pop(script, None)
+        win.destroy()
+        transform_do()
+
+    buttons = tk.Frame(win)
+    buttons.pack(fill='x', pady=5)
+    tk.Button(buttons, text="Пересобрать без выбранных", command=rebuild_without).pack(side='left', padx=5)
+    tk.Button(buttons, text="Вернуть исключённые", command=reset_excludes).pack(side='left', padx=5)
+
+    def load():
+        try:
+            result = analyze_build_size(last["python"], work_dir, scripts)
+            total = path_size(artifact)
+            err = None
+        except Exception as e:
+            result, total, err = [], 0, e
+        def show():
+            if not win.winfo_exists():
+                return
+            if err:
+                status.config(text=f"Ошибка: {err}")
+                return
+            suggested = []
+            for g in result:
+                groups[g["key"]] = g
+                note = "" if g["reachable"] else "не импортируется"
+                tree.insert("", "end", iid=g["key"], values=(g["name"], g["kind"], format_size(g["size"]), g["files"], note),
+                            tags=("suggest",) if g["suggest"] else ())
+                if g["suggest"]:
+                    suggested.append(g["key"])
+            tree.selection_set(suggested)
+            bundled = sum(g["size"] for g in result)
+            text = (f"{artifact}: {format_size(total)} на диске; в сборку попало {format_size(bundled)} "
+                    f"(размеры исходных файлов, до сжатия).")
+            excluded = sorted(transform_excludes.get(scripts[0], ()))
+            if excluded:
+                text += f"\nУже исключено: {', '.join(excluded)}"
+            if suggested:
+                text += (f"\nКрасным — тяжёлые пакеты, до которых не дойти от импортов скрипта "
+                         f"({format_size(sum(groups[k]['size'] for k in suggested))}); они выделены.")
+            status.config(text=text)
+        root.after(0, show)
+    threading.Thread(target=load, daemon=True).start()
+
+tk.Button(frame_transform, text="Анализ размера", command=transform_size_report).pack(pady=2)
+
+frame_startup = tk.Frame(frame_transform)
+frame_startup.pack(pady=2)
+tk.Label(frame_startup, text="Запусков:").pack(side='left')
+transform_runs_var = tk.IntVar(value=5)
+tk.Spinbox(frame_startup, from_=2, to=50, width=4, textvariable=transform_runs_var).pack(side='left', padx=3)
+tk.Label(frame_startup, text="Аргументы для проверки (пусто — выход сразу после старта):").pack(side='left', padx=3)
+transform_smoke_entry = tk.Entry(frame_startup, width=20)
+transform_smoke_entry.pack(side='left', padx=3)
+transform_compare_var = tk.BooleanVar(value=False)
+tk.Checkbutton(frame_startup, text="Сравнить onefile и onedir", variable=transform_compare_var).pack(side='left', padx=3)
+
+def format_ms(value):
+    return f"{value:.0f} мс" if value is not None else "—"
+
+def transform_startup_report():
+    import shlex
+    last = transform_last
+    ok_names = [n for n, r in last.get("results", {}).items() if r["ok"]]
+    if not ok_names:
+        messagebox.showinfo("Замер запуска", "Сначала успешно соберите exe.")
+        return
+    sel = [n for n in transform_tree.selection() if n in ok_names]
+    names = sel or ok_names
+    targets = [t for t in last["targets"] if t["name"] in names]
+    try:
+        runs = max(2, int(transform_runs_var.get()))
+        args = shlex.split(transform_smoke_entry.get())
+    except (ValueError, tk.TclError) as e:
+        messagebox.showerror("Ошибка", f"Ошибка: {e}")
+        return
+    compare = transform_compare_var.get()
+    win = tk.Toplevel(root)
+    win.title("Замер запуска")
+    status = tk.Label(win, text=f"Запуск {len(targets)} сборок по {runs} раз..."
+                      + ("" if args else " Копии с хуком для замера сначала будут собраны.")
+                      + (" Второй вариант упаковки сначала будет собран." if compare else ""),
+                      anchor='w', justify='left')
+    status.pack(fill='x', padx=5, pady=3)
+    frame = tk.Frame(win)
+    frame.pack(fill='both', expand=True, padx=5, pady=5)
+    columns = (("name", "Сборка", 140), ("mode", "Упаковка", 120), ("cold", "Холодный", 90),
+               ("warm", "Тёплый", 90), ("peak", "Пик памяти", 100), ("size", "Размер", 90),
+               ("previous", "Прошлый тёплый", 110), ("delta", "Разница", 90))
+    tree = ttk.Treeview(frame, columns=[c[0] for c in columns], show="headings", height=12)
+    scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scroll.set)
+    tree.pack(side='left', fill='both', expand=True)
+    scroll.pack(side='right', fill='y')
+    for col, title, width in columns:
+        tree.heading(col, text=title)
+        tree.column(col, width=width, anchor='w')
+    tree.tag_configure("best", background="#e0ffe0")
+    tree.tag_configure("failed", foreground="red")
+    rows = {}
+
+    def on_result(name, row):
+        def show():
+            if not win.winfo_exists():
+                return
+            if "error" in row:
+                tree.insert("", "end", values=(name, row["mode"], "ошибка", "", "", "", "", row["error"]),
+                            tags=("failed",))
+                return
+            previous = row["previous"]
+            delta = ""
+            if previous:
+                diff = row["warm_ms"] - previous["warm_ms"]
+                delta = f"{diff:+.0f} мс ({diff / previous['warm_ms'] * 100:+.0f}%)" if previous["warm_ms"] else ""
+            iid = tree.insert("", "end", values=(
+                name, row["mode"], format_ms(row["cold_ms"]), format_ms(row["warm_ms"]),
+                format_size(row["peak"]) if row["peak"] else "—", format_size(row["size"]),
+                format_ms(previous["warm_ms"]) if previous else "—", delta),
+                tags=("failed",) if row["failed"] else ())
+            rows.setdefault(name, []).append((iid, row))
+            # Самый быстрый тёплый запуск среди вариантов одной сборки — зелёным
+            good = [(r["warm_ms"], i) for i, r in rows[name] if not r["failed"]]
+            for i, _ in rows[name]:
+                if not tree.tag_has("failed", i):
+                    tree.item(i, tags=())
+            if len(good) > 1:
+                tree.item(min(good)[1], tags=("best",))
+        root.after(0, show)
+
+    def run():
+        try:
+            benchmark_builds(last["python"], targets, last["results"], last["out_dir"], last["onefile"],
+                             last["shared"], runs, args, compare, transform_icon_path or None, on_result)
+            msg = ("Готово. Холодный — первый запуск, тёплый — медиана остальных"
+                   + ("; пик памяти — процесса Python внутри exe." if not args else
+                      "; пик памяти при аргументах виден, только если exe занимает больше этой программы."))
+            if os.name == "nt":
+                msg += "\nНа Windows для onefile пик памяти — только у загрузчика, без распакованного процесса."
+        except Exception as e:
+            msg = f"Ошибка: {e}"
+        def finish():
+            if win.winfo_exists():
+                status.config(text=msg)
+        root.after(0, finish)
+    threading.Thread(target=run, daemon=True).start()
+
+tk.Button(frame_startup, text="Замер запуска", command=transform_startup_report).pack(side='left', padx=5)
+
 # ========== Справка ==========
 
 frame_help = tk.Frame(root)
@@ -1147,19 +5330,38 @@ PythonToolPack:
 1. Установка библиотек:
    - Введите имя (и версию) библиотеки, нажмите "Установить".
    - Можно по желанию указать путь к своему Python.
+   - С галочкой "Ставить через склад" поставленные колёса сохраняются на локальном
+     складе, и повторная установка той же версии в любой Python их не скачивает.
+     Режим "Только склад" ставит без сети — для машин без интернета.
 
 2. Управление библиотеками:
    - Смотрите список, обновляйте, удаляйте, получайте информацию.
    - Можно обновить все библиотеки сразу.
+   - "Профиль импорта" замеряет, сколько миллисекунд импортируется пакет (сам и с
+     зависимостями) — так видно, что замедляет запуск ваших скриптов.
+   - "Экспорт окружения" сохраняет точные версии с хэшами, "Восстановить окружение"
+     ставит из такого файла только недостающее, одним вызовом pip.
 
 3. Трансформация .py в .exe:
    - Выберите исходные файлы, папку для exe, иконку (по желанию).
-   - Нажмите "Создать exe".(Пока работает только  --onefile)
+   - Нажмите "Создать exe". Несколько файлов собираются параллельно, а
+     неизменившиеся не пересобираются.
+   - "Анализ размера" показывает, какие пакеты сколько весят в exe, и предлагает
+     пересобрать без тяжёлых пакетов, которые скрипт не импортирует. "Вернуть
+     исключённые" отменяет исключения и пересобирает exe.
+   - "Общий анализ" собирает все выбранные скрипты за один проход PyInstaller;
+     в режиме onedir они получают одну общую папку с библиотеками.
+   - "Замер запуска" запускает собранные exe несколько раз и показывает холодный и
+     тёплый старт, пик памяти и разницу с прошлым замером. Без аргументов exe выходит
+     сразу после старта; с аргументами — работает как обычно. Галочка "Сравнить
+     onefile и onedir" дособирает второй вариант, чтобы выбрать самый быстрый.
 
 4. Редактор:
    - Открывайте, редактируйте, сохраняйте, выполняйте Python-код.
    - Поиск, замена, выделение, переход к строке, копирование и вставка.
    - Кнопка "Открыть с GitHub" — для открытия файлов из ваших GitHub-репозиториев.
+   - Кнопка "Сохранить на GitHub" — все изменённые файлы уходят одним коммитом;
+     если файл на GitHub успели изменить после открытия, коммит не создаётся.
    - Для автодополнения и интеллектуальных подсказок установите библиотеку jedi.
                                                   ЭКСКЛЮЗИВНАЯ ФУНКЦИЯ!
    - Кнопка "Связь" включает интеллектуальную подсветку и переход к определению (Ctrl+Enter).
@@ -1180,4 +5382,8 @@ update_github_auth_button()
 
 if __name__ == "__main__":
     show_install_mode()
+    if config.get(UPDATE_CHECK_KEY):
+        schedule_update_check(5000)
+    if "--startup-bench" in sys.argv:
+        root.after_idle(report_first_frame)
     root.mainloop()